@@ -0,0 +1,79 @@
+"""
+Benchmark: GDELT headline deduplication, pairwise SequenceMatcher vs MinHash/LSH.
+Run from the Safety folder:  python benchmarks/bench_news_dedup.py
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.news_service import count_unique_events, similar
+
+AREAS = [
+    "Andheri", "Bandra", "Dadar", "Kurla", "Borivali", "Chembur", "Malad", "Ghatkopar",
+    "Powai", "Worli", "Goregaon", "Mulund", "Vikhroli", "Santacruz", "Colaba", "Sion",
+]
+WORDS = """
+police arrest accused held booked nabbed detained bail court custody probe case
+gang racket suspects victim woman man youth student shopkeeper driver guard trader
+senior citizen builder doctor teacher constable officer jeweller landlord tenant
+robbery snatching murder assault theft burglary fraud drugs kidnapping extortion
+arson stabbing cheating forgery smuggling dacoity molestation bribery scam
+flat shop station market highway bridge society mall temple school hospital
+bank office godown hotel garage railway local train bus depot slum road
+night morning broad daylight knife pistol cash gold jewellery phone laptop bike
+car scooter truck lakh crore rupees cctv footage raid tip-off complaint fir
+crime branch anti-narcotics cell cyber unit zone squad patrol residents protest
+""".split()
+SUFFIXES = [" - Times of India", " | Hindustan Times", " - Mid-day", " | NDTV", " - Free Press Journal"]
+
+def make_fixture(size: int = 250, seed: int = 7):
+    """
+    250 crime headlines shaped like a GDELT ArtList: distinct events, each
+    syndicated by one to four outlets with the usual small edits.
+    """
+    rng = random.Random(seed)
+    articles = []
+    while len(articles) < size:
+        words = rng.sample(WORDS, rng.randint(7, 12))
+        title = f"{rng.choice(AREAS)}: {' '.join(words).capitalize()} {rng.randint(2, 90)}"
+
+        for _ in range(rng.choice([1, 1, 1, 2, 2, 3, 4])):
+            copy = title
+            if rng.random() < 0.3:
+                copy = copy.replace(words[0], rng.choice(WORDS), 1)
+            if rng.random() < 0.3:
+                copy = f"{copy}; probe on"
+            articles.append({"title": copy + rng.choice(SUFFIXES)})
+    rng.shuffle(articles)
+    return articles[:size]
+
+def count_unique_events_pairwise(articles):
+    """The original O(n^2) implementation, kept here as the reference."""
+    seen_titles = []
+    for article in articles:
+        title = article.get("title", "").lower()
+        if not any(similar(title, seen) > 0.6 for seen in seen_titles):
+            seen_titles.append(title)
+    return len(seen_titles)
+
+def best_of(fn, repeat: int = 5):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return result, min(timings)
+
+if __name__ == "__main__":
+    articles = make_fixture()
+
+    reference, pairwise_time = best_of(lambda: count_unique_events_pairwise(articles))
+    result, minhash_time = best_of(lambda: count_unique_events("bench", articles))
+
+    print(f"articles:            {len(articles)}")
+    print(f"pairwise  unique={reference:4d}  {pairwise_time * 1000:8.1f} ms")
+    print(f"minhash   unique={result:4d}  {minhash_time * 1000:8.1f} ms")
+    print(f"speedup:             {pairwise_time / minhash_time:.1f}x")
@@ -0,0 +1,148 @@
+"""
+Benchmark: place and surroundings lookups from the offline OSM extract index,
+checked against the same features served through the Overpass path. Runs offline.
+Run from the Safety folder:  python benchmarks/bench_osm_extract.py
+"""
+import json
+import random
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.feature_store import LAND_FILTERS, LAND_LAYER, OSMFeatureStore, default_filters, features_within
+from services.osm_extract import OSMExtractIndex, ingest
+from services.overpass_client import overpass
+from services.place_tags import PLACE_TAGS, parse_place_tag, place_filters
+from services.tile_cache import tiles_covering
+
+CENTER = (19.07, 72.88)
+SPAN_DEG = 0.1
+LAND_TAGS = [
+    ("landuse", "residential"), ("landuse", "farmland"), ("landuse", "industrial"),
+    ("natural", "wood"), ("natural", "water"), ("building", "yes"), ("building", "house"),
+    ("building", "apartments"), ("highway", "residential"), ("highway", "primary"), ("highway", "footway"),
+]
+
+def make_fixture(size: int = 150000, seed: int = 22):
+    """
+    An Overpass dump of a dense ~11 km city square: mostly buildings and roads,
+    a few thousand amenities, and some district-sized land polygons. Land cover
+    comes with its points (`out geom`), places with their bounds (`out tags bb`).
+    """
+    rng = random.Random(seed)
+    place_tags = [parse_place_tag(tag) for tags in PLACE_TAGS.values() for tag in tags]
+    elements = []
+    for i in range(size):
+        lat = CENTER[0] + rng.uniform(-SPAN_DEG / 2, SPAN_DEG / 2)
+        lon = CENTER[1] + rng.uniform(-SPAN_DEG / 2, SPAN_DEG / 2)
+
+        is_place = rng.random() < 0.03
+        if is_place:
+            key, value = rng.choice(place_tags)
+            element = {"type": rng.choice(["node", "node", "way"]), "id": i, "tags": {key: value, "name": f"Place {i}"}}
+            size_deg = 0.0005
+        else:
+            key, value = rng.choice(LAND_TAGS)
+            element_type = "way" if key in ("building", "highway") or rng.random() < 0.8 else "relation"
+            element = {"type": element_type, "id": i, "tags": {key: value}}
+            size_deg = 0.0003 if key == "building" else (0.004 if key == "highway" else rng.choice([0.002, 0.002, 0.01]))
+            if element_type == "relation" and rng.random() < 0.01:
+                size_deg = 0.5
+
+        if element["type"] == "node":
+            element.update(lat=round(lat, 7), lon=round(lon, 7))
+            elements.append(element)
+            continue
+
+        # Roads are diagonal lines, everything else a closed outline
+        count = 3 if key == "highway" else 6
+        points = [
+            {"lat": round(lat + rng.uniform(-size_deg, size_deg), 7), "lon": round(lon + rng.uniform(-size_deg, size_deg), 7)}
+            for _ in range(count)
+        ]
+        if key != "highway":
+            points.append(points[0])
+        element["bounds"] = {
+            "minlat": min(p["lat"] for p in points), "minlon": min(p["lon"] for p in points),
+            "maxlat": max(p["lat"] for p in points), "maxlon": max(p["lon"] for p in points),
+        }
+        if is_place:
+            pass
+        elif element["type"] == "way":
+            element["geometry"] = points
+        else:
+            element["members"] = [{"type": "way", "ref": i, "role": "outer", "geometry": points}]
+        elements.append(element)
+    return elements
+
+def overlaps(element, south, west, north, east):
+    if "bounds" in element:
+        b = element["bounds"]
+        return b["minlat"] <= north and b["maxlat"] >= south and b["minlon"] <= east and b["maxlon"] >= west
+    return south <= element["lat"] <= north and west <= element["lon"] <= east
+
+def lookups(store, points):
+    results = []
+    for lat, lon in points:
+        tile_map = store.get_tiles(tiles_covering(lat, lon, 1500))
+        places = {
+            place_type: [f["id"] for f in features_within(tile_map, lat, lon, 1500, place_filters(place_type))]
+            for place_type in PLACE_TAGS
+        }
+        tile_map = store.get_tiles(tiles_covering(lat, lon, 300), layer=LAND_LAYER)
+        land = [f["id"] for f in features_within(tile_map, lat, lon, 300, LAND_FILTERS, to_geometry=True)]
+        results.append((places, land))
+    return results
+
+if __name__ == "__main__":
+    elements = make_fixture()
+    rng = random.Random(5)
+    points = [
+        (CENTER[0] + rng.uniform(-0.035, 0.035), CENTER[1] + rng.uniform(-0.035, 0.035)) for _ in range(50)
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dump = Path(tmp) / "city.json"
+        dump.write_text(json.dumps({"elements": elements}))
+        index_path = Path(tmp) / "city.sqlite3"
+
+        started = time.perf_counter()
+        count = ingest(dump, index_path, default_filters())
+        ingest_time = time.perf_counter() - started
+
+        # Reference: the same dump served through the Overpass path, one section per layer
+        land_keys = {key for _, key, _ in LAND_FILTERS}
+
+        def fake_query(query, timeout=30):
+            response = []
+            for section in query.split("out count;")[:-1]:
+                boxes = {tuple(map(float, box)) for box in re.findall(r"\(([-\d.]+),([-\d.]+),([-\d.]+),([-\d.]+)\)", section)}
+                land = "out geom;" in section
+                for el in elements:
+                    if land != land_keys.isdisjoint(el["tags"]) and any(overlaps(el, *box) for box in boxes):
+                        response.append(el if land else {k: v for k, v in el.items() if k not in ("geometry", "members")})
+                response.append({"type": "count", "id": 0, "tags": {}})
+            return {"elements": response}
+
+        overpass.query = fake_query
+        reference = lookups(OSMFeatureStore(), points)
+
+        extract = OSMExtractIndex(index_path)
+        store = OSMFeatureStore(extract=extract)
+        started = time.perf_counter()
+        result = lookups(store, points)
+        cold_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        lookups(store, points)
+        warm_time = time.perf_counter() - started
+
+        print(f"features indexed:    {count} of {len(elements)} in {ingest_time:.1f} s "
+              f"({index_path.stat().st_size / 1e6:.1f} MB, {len(extract.large_features)} large)")
+        print(f"results identical:   {result == reference}")
+        print(f"cold lookup:         {cold_time / len(points) * 1000:8.2f} ms per parcel (places + surroundings)")
+        print(f"warm lookup:         {warm_time / len(points) * 1000:8.2f} ms per parcel")
@@ -0,0 +1,106 @@
+"""
+Benchmark: parsing a large Overpass response whole (what `response.json()` did)
+vs the streaming element parser, on an `out center meta` body and on the
+`out center tags` body the services now request. Comparing the two `tags` rows
+separates the parser from the smaller output mode. Reports parse time and peak
+Python memory. Runs offline.
+Run from the Safety folder:  python benchmarks/bench_overpass_parse.py
+"""
+import gc
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.overpass_client import STREAM_CHUNK_SIZE, ElementStream
+
+AMENITIES = ["hospital", "school", "police", "pharmacy", "bank", "restaurant", "fuel", "place_of_worship"]
+
+def make_response(meta: bool, size: int = 150000, seed: int = 25):
+    """A city-wide response: nodes and ways with centers, names and addresses."""
+    rng = random.Random(seed)
+    meta_rng = random.Random(seed + 1)
+    elements = []
+    for i in range(size):
+        element = {"type": "node" if rng.random() < 0.6 else "way", "id": 10 ** 9 + i}
+        lat, lon = 19.0 + rng.random() * 0.2, 72.8 + rng.random() * 0.2
+        if element["type"] == "node":
+            element.update(lat=lat, lon=lon)
+        else:
+            element["center"] = {"lat": lat, "lon": lon}
+        if meta:
+            element.update(
+                timestamp="2023-05-14T09:21:07Z", version=meta_rng.randint(1, 12),
+                changeset=meta_rng.randint(10 ** 7, 10 ** 8), user=f"mapper_{meta_rng.randint(1, 5000)}",
+                uid=meta_rng.randint(1, 10 ** 7),
+            )
+        element["tags"] = {
+            "amenity": rng.choice(AMENITIES), "name": f"Place {i}",
+            "addr:street": f"Road {rng.randint(1, 400)}", "addr:city": "Mumbai",
+        }
+        elements.append(element)
+    return elements
+
+def overpass_json(elements):
+    """Serialized the way Overpass does: every element starts on a new line."""
+    header = '{\n  "version": 0.6,\n  "generator": "Overpass API",\n  "elements": [\n\n'
+    return header + ",\n".join(json.dumps(element, indent=2) for element in elements) + "\n\n  ]\n}\n"
+
+def parse_whole(path):
+    # What response.json() did: the full body, its text, then every object
+    body = path.read_bytes()
+    return json.loads(body.decode("utf-8"))["elements"]
+
+def parse_streaming(path):
+    stream = ElementStream()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            stream.feed(chunk)
+    return stream.close()["elements"]
+
+def measure(parse, path, rounds: int = 5):
+    """Median parse time, then peak memory of one more parse (traced separately,
+    since tracemalloc slows allocation-heavy parsing down several times)."""
+    times = []
+    for _ in range(rounds):
+        gc.collect()
+        start = time.perf_counter()
+        parse(path)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    parse(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times), peak
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        meta_path = Path(tmp) / "meta.json"
+        tags_path = Path(tmp) / "tags.json"
+        meta_path.write_text(overpass_json(make_response(meta=True)))
+        tags_path.write_text(overpass_json(make_response(meta=False)))
+
+        runs = [
+            ("out center meta, whole", parse_whole, meta_path),
+            ("out center meta, stream", parse_streaming, meta_path),
+            ("out center tags, whole", parse_whole, tags_path),
+            ("out center tags, stream", parse_streaming, tags_path),
+        ]
+        for label, parse, path in runs:
+            seconds, peak = measure(parse, path)
+            print(f"{label:26s} body {path.stat().st_size / 1e6:6.1f} MB   parse {seconds * 1000:7.0f} ms   "
+                  f"peak {peak / 1e6:6.1f} MB")
+
+        fields = ("type", "id", "lat", "lon", "center", "tags")
+        reference = [{key: element[key] for key in fields if key in element} for element in parse_whole(meta_path)]
+        print(f"elements identical: {parse_streaming(meta_path) == reference and parse_streaming(tags_path) == reference}")
@@ -1,13 +1,57 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import APIRouter, FastAPI, Query
 from fastapi.middleware.cors import CORSMiddleware
 
-from services.geocode_service import reverse_geocode
-from services.places_service import get_nearby_places, count_nearby_places
-from services.news_service import get_crime_news_count
+from services.geocode_cache import geocode_cache
+from services.geocode_service import reverse_geocode_async
+from services.feature_store import osm_features
+from services.http_client import close_clients, open_clients
+from services.places_service import get_nearby_places_multi_async
+from services.news_service import get_crime_news_count_async, news_cache
+from services.overpass_client import overpass
 from services.scoring_service import calculate_safety_score
 
 router = APIRouter()
-app = FastAPI(title="Safety Intelligence API")
+
+# Response key -> place type, fetched together in one Overpass query
+SAFETY_PLACE_TYPES = {
+    "police_stations": "police",
+    "hospitals": "hospital",
+    "fire_stations": "fire_station",
+    "schools": "school",
+    "banks": "bank",
+    "atms": "atm",
+    "pharmacies": "pharmacy",
+    "restaurants": "restaurant",
+    "fuel_stations": "fuel",
+    "marketplaces": "marketplace",
+}
+
+# Per-source deadlines (seconds); a source that misses it is reported as unavailable
+GEOCODE_DEADLINE = 10
+# Leaves room for the feature store's 25 s Overpass timeout on the places layer
+PLACES_DEADLINE = 30
+NEWS_DEADLINE = 15
+
+EMPTY_LOCATION = {
+    "display_name": None,
+    "city": None,
+    "district": None,
+    "state": None,
+    "country": None,
+    "postcode": None
+}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pooled keep-alive connections shared by every upstream call
+    open_clients()
+    yield
+    await close_clients()
+
+app = FastAPI(title="Safety Intelligence API", lifespan=lifespan)
 
 # CORS (important when frontend calls backend)
 app.add_middleware(
@@ -22,11 +66,34 @@ app.add_middleware(
 def home():
     return {"message": "Safety Intelligence API is running"}
 
-@router.get("/safety")
-def safety(lat: float = Query(...), lon: float = Query(...)):
+async def with_deadline(coro, seconds: float, default, source: str, unavailable: list):
+    """
+    Awaits an upstream call, falling back to a default if it fails or times out.
+    """
+    try:
+        return await asyncio.wait_for(coro, timeout=seconds)
+    except Exception as e:
+        print(f"SAFETY: {source} unavailable: {e!r}")
+        unavailable.append(source)
+        return default
 
-    # 1. Reverse geocode to get location name
-    location = reverse_geocode(lat, lon)
+@router.get("/safety")
+async def safety(lat: float = Query(...), lon: float = Query(...)):
+    unavailable = []
+
+    # 1. Nearby places do not depend on the location name, so start them right away
+    places_task = asyncio.create_task(with_deadline(
+        get_nearby_places_multi_async(lat, lon, SAFETY_PLACE_TYPES.values(), radius=1500),
+        PLACES_DEADLINE,
+        {place_type: [] for place_type in SAFETY_PLACE_TYPES.values()},
+        "places",
+        unavailable,
+    ))
+
+    # 2. Reverse geocode to get location name (overlaps with the places lookup)
+    location = await with_deadline(
+        reverse_geocode_async(lat, lon), GEOCODE_DEADLINE, dict(EMPTY_LOCATION), "geocode", unavailable
+    )
 
     city = location.get("city") or ""
     district = location.get("district") or ""
@@ -38,42 +105,21 @@ def safety(lat: float = Query(...), lon: float = Query(...)):
     if not city:
         location_query = f"{district} {state} India".strip()
 
-    # 2. Get detailed lists of nearby places (Overpass API)
-    police_stations = get_nearby_places(lat, lon, "police", radius=1500)
-    hospitals = get_nearby_places(lat, lon, "hospital", radius=1500)
-    fire_stations = get_nearby_places(lat, lon, "fire_station", radius=1500)
-    schools = get_nearby_places(lat, lon, "school", radius=1500)
-    banks = get_nearby_places(lat, lon, "bank", radius=1500)
-    atms = get_nearby_places(lat, lon, "atm", radius=1500)
-    pharmacies = get_nearby_places(lat, lon, "pharmacy", radius=1500)
-    restaurants = get_nearby_places(lat, lon, "restaurant", radius=1500)
-    fuel_stations = get_nearby_places(lat, lon, "fuel", radius=1500)
-    marketplaces = get_nearby_places(lat, lon, "marketplace", radius=1500)
+    # 3. Crime news count (GDELT API), while places are still in flight
+    crime_news_count, places = await asyncio.gather(
+        with_deadline(get_crime_news_count_async(location_query), NEWS_DEADLINE, 0, "news", unavailable),
+        places_task,
+    )
 
-    # Get counts for scoring
-    police_count = len(police_stations)
-    hospital_count = len(hospitals)
+    all_places = {key: places[place_type] for key, place_type in SAFETY_PLACE_TYPES.items()}
 
-    # 3. Crime news count (GDELT API)
-    crime_news_count = get_crime_news_count(location_query)
+    # Get counts for scoring
+    police_count = len(all_places["police_stations"])
+    hospital_count = len(all_places["hospitals"])
 
     # 4. Calculate safety score
     score, risk = calculate_safety_score(police_count, hospital_count, crime_news_count)
 
-    # 5. Compile all places found
-    all_places = {
-        "police_stations": police_stations,
-        "hospitals": hospitals,
-        "fire_stations": fire_stations,
-        "schools": schools,
-        "banks": banks,
-        "atms": atms,
-        "pharmacies": pharmacies,
-        "restaurants": restaurants,
-        "fuel_stations": fuel_stations,
-        "marketplaces": marketplaces
-    }
-
     return {
         "location": location,
         "lat": lat,
@@ -84,18 +130,20 @@ def safety(lat: float = Query(...), lon: float = Query(...)):
         "safetyScore": score,
         "riskLevel": risk,
         "places": all_places,
-        "summary": {
-            "police_stations": len(police_stations),
-            "hospitals": len(hospitals),
-            "fire_stations": len(fire_stations),
-            "schools": len(schools),
-            "banks": len(banks),
-            "atms": len(atms),
-            "pharmacies": len(pharmacies),
-            "restaurants": len(restaurants),
-            "fuel_stations": len(fuel_stations),
-            "marketplaces": len(marketplaces)
-        }
+        "summary": {key: len(value) for key, value in all_places.items()},
+        "unavailableSources": unavailable
+    }
+
+@router.get("/safety/stats")
+def safety_stats():
+    """Cache hit/miss counters and Overpass mirror health."""
+    return {
+        "caches": {
+            "osm_feature_tiles": osm_features.stats(),
+            "reverse_geocode": geocode_cache.stats(),
+            "crime_news": news_cache.stats(),
+        },
+        "overpass_mirrors": overpass.stats(),
     }
 
 app.include_router(router)
@@ -0,0 +1,183 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+from .coalesce import Coalescer
+
+class TTLCache:
+    """
+    Thread-safe in-memory cache with per-entry expiry and an LRU size bound.
+    With `maxweight`, entries also carry a weight (e.g. the items they hold) and
+    the least recently used ones are evicted while the total exceeds it.
+    Keeps hit/miss/eviction counters for monitoring. A ttl of 0 or None never expires.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600, maxweight: int = None):
+        self.maxsize = maxsize
+        self.maxweight = maxweight
+        self.ttl = ttl
+        self.weight = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, value, weight = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.weight -= weight
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl: float = None, weight: int = 1):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            previous = self._data.get(key)
+            if previous is not None:
+                self.weight -= previous[2]
+            self._data[key] = (expires_at, value, weight)
+            self._data.move_to_end(key)
+            self.weight += weight
+            # The newest entry is kept even if it alone is over the weight bound
+            while len(self._data) > self.maxsize or (
+                self.maxweight is not None and self.weight > self.maxweight and len(self._data) > 1
+            ):
+                _, (_, _, evicted_weight) = self._data.popitem(last=False)
+                self.weight -= evicted_weight
+                self.evictions += 1
+
+    def __contains__(self, key):
+        """Whether a live entry exists; unlike get, neither counted nor refreshed."""
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and (entry[0] is None or entry[0] > time.monotonic())
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.weight = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            }
+            if self.maxweight is not None:
+                stats["weight"] = self.weight
+                stats["maxweight"] = self.maxweight
+            return stats
+
+class StaleWhileRevalidateCache:
+    """
+    Cache that keeps serving an entry after it goes stale (older than `ttl`)
+    while a single background refresh fetches a new value. Entries older than
+    `max_stale` are dropped and fetched in the foreground again.
+
+    Fetch functions return None on failure; failures are never cached.
+    Concurrent misses for one key share a single fetch.
+    """
+
+    def __init__(self, ttl: float, max_stale: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.entries = TTLCache(maxsize=maxsize, ttl=max_stale)
+        self.stale_hits = 0
+        self.refreshes = 0
+        self._coalescer = Coalescer()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._tasks = set()
+
+    def _lookup(self, key):
+        """Cached value and whether it needs a refresh."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None, False
+        value, fetched_at = entry
+        stale = time.monotonic() - fetched_at > self.ttl
+        if stale:
+            with self._lock:
+                self.stale_hits += 1
+        return value, stale
+
+    def _claim_refresh(self, key):
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            self.refreshes += 1
+            return True
+
+    def _release_refresh(self, key):
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def _store(self, key, value):
+        if value is not None:
+            self.entries.set(key, (value, time.monotonic()))
+        return value
+
+    def get_or_fetch(self, key, fetch):
+        value, stale = self._lookup(key)
+        if value is None:
+            return self._coalescer.run(key, lambda: self._store(key, fetch()))
+
+        if stale and self._claim_refresh(key):
+            def refresh():
+                try:
+                    self._coalescer.run(key, lambda: self._store(key, fetch()))
+                finally:
+                    self._release_refresh(key)
+
+            threading.Thread(target=refresh, daemon=True).start()
+        return value
+
+    async def get_or_fetch_async(self, key, fetch_async):
+        value, stale = self._lookup(key)
+        if value is None:
+            async def fetch_and_store():
+                return self._store(key, await fetch_async())
+
+            return await self._coalescer.run_async(key, fetch_and_store)
+
+        if stale and self._claim_refresh(key):
+            async def refresh():
+                try:
+                    self._store(key, await fetch_async())
+                finally:
+                    self._release_refresh(key)
+
+            # Keep a reference so the task is not garbage collected mid-flight
+            task = asyncio.ensure_future(refresh())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return value
+
+    def stats(self):
+        stats = self.entries.stats()
+        with self._lock:
+            stats["stale_hits"] = self.stale_hits
+            stats["background_refreshes"] = self.refreshes
+        return stats
@@ -0,0 +1,129 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+class Coalescer:
+    """
+    Collapses concurrent calls for the same key into a single upstream call.
+
+    The first caller for a key does the work; everyone who asks for the same
+    key while it is running waits for, and shares, that result.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._inflight_async = {}
+
+    def run(self, key, fn):
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+
+        if not owner:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def run_async(self, key, coro_fn):
+        task = self._inflight_async.get(key)
+        if task is None:
+            task = asyncio.ensure_future(coro_fn())
+            self._inflight_async[key] = task
+            task.add_done_callback(lambda _: self._inflight_async.pop(key, None))
+
+        # Shielded so one caller hitting its deadline does not cancel the shared call
+        return await asyncio.shield(task)
+
+class KeySetCoalescer:
+    """
+    Coalesces calls that each need a set of keys (e.g. map tiles), from threads
+    and coroutines alike. Every key in flight has exactly one fetch: a caller
+    fetches only the keys nobody is fetching yet and waits for the rest.
+    `extra` keys are fetched along with them if nobody is fetching them yet,
+    but never waited for.
+
+    `fn(keys)` / `coro_fn(keys)` return {key: value} for the keys they were
+    given, or None on failure (every one of those keys then gets None).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._tasks = set()
+
+    def _claim(self, keys, extra):
+        owned, futures = [], {}
+        with self._lock:
+            for key in keys:
+                future = self._inflight.get(key)
+                if future is None:
+                    future = Future()
+                    self._inflight[key] = future
+                    owned.append(key)
+                futures[key] = future
+            if owned:
+                for key in extra:
+                    if key not in self._inflight and key not in futures:
+                        self._inflight[key] = futures[key] = Future()
+                        owned.append(key)
+        return owned, futures
+
+    def _settle(self, owned, futures, result=None, error=None, cancelled=False):
+        with self._lock:
+            for key in owned:
+                self._inflight.pop(key, None)
+        for key in owned:
+            if cancelled:
+                futures[key].cancel()
+            elif error is not None:
+                futures[key].set_exception(error)
+            else:
+                futures[key].set_result(None if result is None else result.get(key))
+
+    def run(self, keys, fn, extra=()):
+        owned, futures = self._claim(keys, extra)
+        if owned:
+            try:
+                result = fn(owned)
+            except BaseException as e:
+                self._settle(owned, futures, error=e)
+                raise
+            self._settle(owned, futures, result)
+        return {key: futures[key].result() for key in keys}
+
+    async def run_async(self, keys, coro_fn, extra=()):
+        owned, futures = self._claim(keys, extra)
+        if owned:
+            def finish(task):
+                self._tasks.discard(task)
+                if task.cancelled():
+                    self._settle(owned, futures, cancelled=True)
+                elif task.exception() is not None:
+                    self._settle(owned, futures, error=task.exception())
+                else:
+                    self._settle(owned, futures, task.result())
+
+            # Keep a reference so the fetch is not garbage collected mid-flight
+            task = asyncio.ensure_future(coro_fn(owned))
+            self._tasks.add(task)
+            task.add_done_callback(finish)
+
+        results = {}
+        for key in keys:
+            # Shielded so one caller hitting its deadline does not cancel the shared fetch
+            results[key] = await asyncio.shield(asyncio.wrap_future(futures[key]))
+        return results
@@ -0,0 +1,374 @@
+import asyncio
+import os
+
+import numpy as np
+
+from .cache import TTLCache
+from .coalesce import KeySetCoalescer
+from .geo import haversine_distances, polyline_distances
+from .osm_extract import open_extract
+from .overpass_client import overpass
+from .place_tags import PLACE_TAGS, place_filters
+from .tile_cache import TILE_DEG, TILE_TTL, element_order, feature_from_element, tile_of, tile_rectangles
+
+# Whole tiles are cached, so far fewer entries are needed than per (tile, category).
+# Tiles are also bounded by the memory their features take per worker: a parsed
+# feature with a few short tags measured 800-1100 bytes, plus 16 bytes per point.
+# 256 MB holds about 250k features, i.e. thousands of place tiles or ~20 tiles of
+# a dense city's buildings and roads.
+FEATURE_TILE_CACHE_SIZE = 2000
+FEATURE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+FEATURE_BYTES = 1000
+
+# Index built by `python -m services.osm_extract`; when set, Overpass is not used for stored features
+OSM_EXTRACT_PATH = os.environ.get("OSM_EXTRACT_PATH")
+
+# Land cover and infrastructure used by the surroundings analyzer
+LAND_FILTERS = [
+    (("way", "relation"), "landuse", None),
+    (("way", "relation"), "natural", None),
+    (("way",), "building", None),
+    (("way",), "highway", None),
+]
+
+# Places and land cover are cached as separate layers, so /safety never waits for the
+# buildings and roads only /surroundings scores. A land fetch takes the places of its
+# tiles along when nobody has fetched them yet, so every feature is downloaded once.
+PLACES_LAYER = "places"
+LAND_LAYER = "land"
+LAYER_COMPANIONS = {LAND_LAYER: (PLACES_LAYER,)}
+
+# Overpass timeouts per layer. Places must come back within /safety's 30 s places
+# deadline; land cover for a few tiles of a dense city takes longer.
+LAYER_QUERY_TIMEOUTS = {PLACES_LAYER: 25, LAND_LAYER: 60}
+
+# Places only need a location; land cover keeps the points of its ways and relations
+# so radius tests measure the lines themselves, as Overpass `around` does
+LAYER_OUTPUTS = {PLACES_LAYER: "out tags bb;", LAND_LAYER: "out geom;"}
+
+def place_layer_filters():
+    """Every known place type's filters, each once."""
+    filters = []
+    for place_type in PLACE_TAGS:
+        for place_filter in place_filters(place_type):
+            if place_filter not in filters:
+                filters.append(place_filter)
+    return filters
+
+def default_layers():
+    """
+    Filters per layer. Filters are (element types, key, value); a value of None
+    matches any value.
+    """
+    return {PLACES_LAYER: place_layer_filters(), LAND_LAYER: list(LAND_FILTERS)}
+
+def default_filters():
+    """Every feature an OSM-derived score needs: all known place types plus land cover."""
+    return [place_filter for filters in default_layers().values() for place_filter in filters]
+
+def filter_clause(element_type, key, value, bbox):
+    if value is None:
+        return f'{element_type}["{key}"]{bbox};'
+    return f'{element_type}["{key}"="{value}"]{bbox};'
+
+def build_feature_query(sections, timeout: int):
+    """
+    Single Overpass query with one union per (filters, tiles, output) section,
+    each over a few rectangular bounding boxes of its tiles. Every section ends
+    with `out count`, whose count element tells the sections apart in the response.
+    `out tags bb` gives nodes their coordinates and ways/relations their bounds,
+    without node lists or metadata.
+    """
+    statements = []
+    for filters, tiles, output in sections:
+        bboxes = [
+            f"({min_row * TILE_DEG:.5f},{min_col * TILE_DEG:.5f},{(max_row + 1) * TILE_DEG:.5f},{(max_col + 1) * TILE_DEG:.5f})"
+            for min_row, min_col, max_row, max_col in tile_rectangles(tiles)
+        ]
+        clauses = "\n      ".join(
+            filter_clause(element_type, key, value, bbox)
+            for bbox in bboxes
+            for element_types, key, value in filters
+            for element_type in element_types
+        )
+        statements.append(f"""(
+      {clauses}
+    );
+    {output}
+    out count;""")
+
+    body = "\n    ".join(statements)
+    return f"""
+    [out:json][timeout:{timeout}];
+    {body}
+    """
+
+def split_sections(elements, count: int):
+    """
+    The elements of each section of a build_feature_query response, or None
+    if the response does not end every section (e.g. Overpass timed out).
+    """
+    sections = [[]]
+    for element in elements:
+        if element.get("type") == "count":
+            sections.append([])
+        else:
+            sections[-1].append(element)
+    if len(sections) != count + 1 or sections[-1]:
+        return None
+    return sections[:-1]
+
+def feature_weight(features):
+    """Approximate memory held by a tile's features, in bytes."""
+    return sum(
+        FEATURE_BYTES + (0 if feature["geometry"] is None else feature["geometry"].nbytes)
+        for feature in features
+    )
+
+class FeatureTile:
+    """
+    Features stored for one tile, indexed by (key, value) and by (key, None)
+    for the keys the store filters on.
+    """
+
+    def __init__(self, features, keys):
+        self.features = features
+        self.index = {}
+        for i, feature in enumerate(features):
+            for key, value in feature["tags"].items():
+                if key in keys:
+                    self.index.setdefault((key, value), []).append(i)
+                    self.index.setdefault((key, None), []).append(i)
+
+    def select(self, filters):
+        """Features matching any filter, keyed by (type, id)."""
+        found = {}
+        for element_types, key, value in filters:
+            for i in self.index.get((key, value), ()):
+                feature = self.features[i]
+                if feature["type"] in element_types:
+                    found[(feature["type"], feature["id"])] = feature
+        return found
+
+def features_within(tile_map, lat: float, lon: float, radius: float, filters, to_geometry: bool = False):
+    """
+    Features from the given tiles matching any filter within `radius` meters,
+    each once and in the order Overpass returns them.
+
+    Distance is measured to a feature's point, or with `to_geometry` to the
+    nearest point of its lines (as Overpass `around` does for ways and
+    relations), falling back to its bounding box when it has no geometry.
+    """
+    found = {}
+    for entry in tile_map.values():
+        found.update(entry.select(filters))
+    if not found:
+        return []
+
+    features = sorted(found.values(), key=element_order)
+    lats = np.array([feature["lat"] for feature in features], dtype=float)
+    lons = np.array([feature["lon"] for feature in features], dtype=float)
+
+    if to_geometry:
+        for i, feature in enumerate(features):
+            box = feature["bounds"]
+            if box is not None:
+                lats[i] = min(max(lat, box[0]), box[2])
+                lons[i] = min(max(lon, box[1]), box[3])
+
+    distances = haversine_distances(lat, lon, lats, lons)
+
+    if to_geometry:
+        # The bounding box is never farther than the lines inside it, so only features
+        # whose box reaches into the circle have their lines measured
+        measured = [
+            i for i, distance in enumerate(distances.tolist())
+            if distance <= radius and features[i]["geometry"] is not None
+        ]
+        if measured:
+            distances[measured] = polyline_distances(lat, lon, [features[i]["geometry"] for i in measured])
+
+    return [feature for feature, distance in zip(features, distances.tolist()) if distance <= radius]
+
+class OSMFeatureStore:
+    """
+    Local store of OpenStreetMap features per layer and grid tile, shared by
+    every OSM-derived score (nearby places, surroundings).
+
+    A layer's tile is fetched once with a superset query covering all of the
+    layer's filters and then answers any of them locally; each tile in flight
+    is fetched by one request only, and overlapping requests (sync or async)
+    wait for it. A fetch also takes the companion layers of its tiles along
+    when nobody has them yet. With an offline `extract` index, tiles are read
+    from it instead and Overpass is never called for them.
+    """
+
+    def __init__(self, layers=None, maxsize: int = FEATURE_TILE_CACHE_SIZE,
+                 max_bytes: int = FEATURE_CACHE_MAX_BYTES, ttl: float = TILE_TTL, extract=None):
+        self.extract = extract
+        if layers is None:
+            layers = default_layers()
+            if extract is not None:
+                layers = {
+                    layer: [layer_filter for layer_filter in filters if layer_filter in extract.filters]
+                    for layer, filters in layers.items()
+                }
+        self.layers = {layer: list(filters) for layer, filters in layers.items()}
+        self.keys = {layer: {key for _, key, _ in filters} for layer, filters in self.layers.items()}
+        self.tiles = TTLCache(maxsize=maxsize, ttl=ttl, maxweight=max_bytes)
+        self.fetches = 0
+        self.fetched_features = 0
+        self._coalescer = KeySetCoalescer()
+
+    def covers(self, filters, layer: str = PLACES_LAYER):
+        """Whether every filter is answered by what the store fetches for the layer."""
+        return all(
+            any(
+                key == stored_key
+                and stored_value in (None, value)
+                and set(element_types) <= set(stored_types)
+                for stored_types, stored_key, stored_value in self.layers[layer]
+            )
+            for element_types, key, value in filters
+        )
+
+    def build(self, elements):
+        """A FeatureTile over arbitrary Overpass elements, for place queries the store does not cover."""
+        features = [feature_from_element(element) for element in elements]
+        return FeatureTile([feature for feature in features if feature is not None], self.keys[PLACES_LAYER])
+
+    def _lookup(self, layer, tiles):
+        found = {}
+        missing = []
+        for tile in tiles:
+            entry = self.tiles.get((layer, tile))
+            if entry is None:
+                missing.append(tile)
+            else:
+                found[tile] = entry
+        return found, missing
+
+    def _cache(self, layer, by_tile):
+        stored = {}
+        for tile, features in by_tile.items():
+            entry = FeatureTile(features, self.keys[layer])
+            self.tiles.set((layer, tile), entry, weight=feature_weight(features))
+            stored[tile] = entry
+        return stored
+
+    def _read_extract(self, layer, missing):
+        """Reads and caches the layer's features of the missing tiles from the extract."""
+        return self._cache(layer, self.extract.read(missing, self.layers[layer]))
+
+    def _store(self, layer, tiles, elements):
+        """
+        Splits the elements of a query over the given tiles into per-tile
+        entries. Nodes go to their tile; ways and relations to every one of
+        the tiles their bounding box overlaps.
+        """
+        by_tile = {tile: [] for tile in tiles}
+        min_row, max_row = min(row for row, _ in tiles), max(row for row, _ in tiles)
+        min_col, max_col = min(col for _, col in tiles), max(col for _, col in tiles)
+
+        count = 0
+        for element in elements:
+            feature = feature_from_element(element)
+            if feature is None:
+                continue
+            count += 1
+
+            box = feature["bounds"]
+            if box is None:
+                tile = tile_of(feature["lat"], feature["lon"])
+                if tile in by_tile:
+                    by_tile[tile].append(feature)
+                continue
+
+            south, west = tile_of(box[0], box[1])
+            north, east = tile_of(box[2], box[3])
+            for row in range(max(south, min_row), min(north, max_row) + 1):
+                for col in range(max(west, min_col), min(east, max_col) + 1):
+                    if (row, col) in by_tile:
+                        by_tile[(row, col)].append(feature)
+
+        self.fetched_features += count
+        return self._cache(layer, by_tile)
+
+    def _claims(self, layer, missing):
+        """(keys to fetch or wait for, companion keys to fetch along if free)."""
+        keys = [(layer, tile) for tile in missing]
+        extra = []
+        for companion in LAYER_COMPANIONS.get(layer, ()):
+            extra.extend((companion, tile) for tile in missing if (companion, tile) not in self.tiles)
+        return keys, extra
+
+    def _query(self, owned):
+        """({layer: tiles} and the Overpass query fetching them, with its timeout)."""
+        by_layer = {}
+        for layer, tile in owned:
+            by_layer.setdefault(layer, []).append(tile)
+        timeout = max(LAYER_QUERY_TIMEOUTS[layer] for layer in by_layer)
+        sections = [(self.layers[layer], tiles, LAYER_OUTPUTS[layer]) for layer, tiles in by_layer.items()]
+        return by_layer, build_feature_query(sections, timeout), timeout
+
+    def _store_response(self, by_layer, data):
+        """{(layer, tile): FeatureTile} from a _query response, or None if it failed."""
+        sections = None if data is None else split_sections(data.get("elements", []), len(by_layer))
+        if sections is None:
+            return None
+        self.fetches += 1
+        stored = {}
+        for (layer, tiles), elements in zip(by_layer.items(), sections):
+            stored.update(((layer, tile), entry) for tile, entry in self._store(layer, tiles, elements).items())
+        return stored
+
+    def get_tiles(self, tiles, layer: str = PLACES_LAYER):
+        """
+        {tile: FeatureTile} of the layer for every requested tile, fetching the
+        missing ones nobody else is already fetching in a single Overpass request,
+        and waiting for the rest. Returns None if a needed fetch fails.
+        """
+        found, missing = self._lookup(layer, tiles)
+        if missing and self.extract is not None:
+            found.update(self._read_extract(layer, missing))
+        elif missing:
+            def fetch(owned):
+                by_layer, query, timeout = self._query(owned)
+                return self._store_response(by_layer, overpass.query(query, timeout=timeout))
+
+            keys, extra = self._claims(layer, missing)
+            fetched = self._coalescer.run(keys, fetch, extra)
+            if None in fetched.values():
+                return None
+            found.update((tile, entry) for (_, tile), entry in fetched.items())
+        return found
+
+    async def get_tiles_async(self, tiles, layer: str = PLACES_LAYER, client=None):
+        """
+        Async variant of get_tiles using the shared httpx.AsyncClient. Tiles in
+        flight are shared with sync callers too.
+        """
+        found, missing = self._lookup(layer, tiles)
+        if missing and self.extract is not None:
+            # SQLite reads and tag decoding would hold up every other request on the loop
+            found.update(await asyncio.to_thread(self._read_extract, layer, missing))
+        elif missing:
+            async def fetch(owned):
+                by_layer, query, timeout = self._query(owned)
+                return self._store_response(by_layer, await overpass.query_async(query, timeout=timeout, client=client))
+
+            keys, extra = self._claims(layer, missing)
+            fetched = await self._coalescer.run_async(keys, fetch, extra)
+            if None in fetched.values():
+                return None
+            found.update((tile, entry) for (_, tile), entry in fetched.items())
+        return found
+
+    def stats(self):
+        stats = self.tiles.stats()
+        stats["upstream_fetches"] = self.fetches
+        stats["fetched_features"] = self.fetched_features
+        stats["extract"] = None if self.extract is None else self.extract.stats()
+        return stats
+
+osm_features = OSMFeatureStore(extract=open_extract(OSM_EXTRACT_PATH))
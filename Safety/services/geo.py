@@ -0,0 +1,61 @@
+import math
+
+import numpy as np
+
+def haversine_distance(lat1, lon1, lat2, lon2):
+    """
+    Calculates distance between two points in meters.
+    Used to detect if two 'places' are actually the same building.
+    """
+    R = 6371000  # Earth radius in meters
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = math.radians(lat2 - lat1)
+    dlambda = math.radians(lon2 - lon1)
+
+    a = math.sin(dphi / 2)**2 + \
+        math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2)**2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+    return R * c
+
+def haversine_distances(lat, lon, lats, lons):
+    """
+    Vectorised haversine_distance from one point to arrays of points, in meters.
+    """
+    R = 6371000  # Earth radius in meters
+    phi1, phi2 = np.radians(lat), np.radians(lats)
+    dphi = np.radians(lats - lat)
+    dlambda = np.radians(lons - lon)
+
+    a = np.sin(dphi / 2)**2 + \
+        np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2)**2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+    return R * c
+
+def polyline_distances(lat, lon, lines):
+    """
+    Distance in meters from one point to the nearest point of each line.
+    A line is an (n, 2) array of (lat, lon) with NaN rows between separate
+    parts. Measured in a flat projection around the point, which is accurate
+    to well under 0.1% over a few km.
+    """
+    R = 6371000  # Earth radius in meters
+    lengths = [len(line) for line in lines]
+    points = np.concatenate(lines)
+    owners = np.repeat(np.arange(len(lines)), lengths)
+    x = np.radians(points[:, 1] - lon) * R * math.cos(math.radians(lat))
+    y = np.radians(points[:, 0] - lat) * R
+
+    # Nearest point of the segment from each point to the next one of the same line
+    dx, dy = x[1:] - x[:-1], y[1:] - y[:-1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = np.clip(-(x[:-1] * dx + y[:-1] * dy) / (dx * dx + dy * dy), 0.0, 1.0)
+    segments = np.hypot(x[:-1] + t * dx, y[:-1] + t * dy)
+    segments[owners[1:] != owners[:-1]] = np.nan
+
+    # NaN gaps and zero-length segments drop out; the vertices themselves still count
+    nearest = np.hypot(x, y)
+    nearest[:-1] = np.fmin(nearest[:-1], segments)
+    distances = np.fmin.reduceat(nearest, np.r_[0, np.cumsum(lengths)[:-1]])
+    return np.where(np.isnan(distances), np.inf, distances)
@@ -0,0 +1,96 @@
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+# Nominatim zoom=14 answers are the same for every point in a few hundred metres,
+# so coordinates are snapped to a grid of this size (~550 m) before lookup
+GEOCODE_GRID_DEG = 0.005
+GEOCODE_ZOOM = 14
+
+GEOCODE_TTL = 30 * 24 * 3600
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parents[1] / "cache" / "geocode.sqlite3"
+CACHE_PATH = Path(os.environ.get("GEOCODE_CACHE_PATH", DEFAULT_CACHE_PATH))
+
+def snap_to_cell(lat: float, lon: float):
+    """Grid cell containing a point."""
+    return (math.floor(lat / GEOCODE_GRID_DEG), math.floor(lon / GEOCODE_GRID_DEG))
+
+def cell_center(cell):
+    row, col = cell
+    return (round((row + 0.5) * GEOCODE_GRID_DEG, 6), round((col + 0.5) * GEOCODE_GRID_DEG, 6))
+
+class GeocodeCache:
+    """
+    Persistent SQLite cache of reverse-geocode results per grid cell.
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl: float = GEOCODE_TTL):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS reverse_geocode ("
+                " cell TEXT PRIMARY KEY,"
+                " location TEXT NOT NULL,"
+                " fetched_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def _key(cell):
+        return f"{GEOCODE_ZOOM}:{cell[0]}:{cell[1]}"
+
+    def get(self, cell):
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT location, fetched_at FROM reverse_geocode WHERE cell = ?", (self._key(cell),)
+            ).fetchone()
+
+            if row is None or time.time() - row[1] > self.ttl:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return json.loads(row[0])
+
+    def set(self, cell, location):
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO reverse_geocode (cell, location, fetched_at) VALUES (?, ?, ?)",
+                (self._key(cell), json.dumps(location), time.time()),
+            )
+            conn.commit()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            size = self._connection().execute("SELECT COUNT(*) FROM reverse_geocode").fetchone()[0]
+            return {
+                "size": size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            }
+
+geocode_cache = GeocodeCache()
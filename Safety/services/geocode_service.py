@@ -1,9 +1,22 @@
-import requests
+import asyncio
 
-def reverse_geocode(lat: float, lon: float):
-    url = "https://nominatim.openstreetmap.org/reverse"
+from .coalesce import Coalescer
+from .geocode_cache import cell_center, geocode_cache, snap_to_cell
+from .http_client import get_async_client, get_session
+from .rate_limit import RateLimiter
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/reverse"
+
+HEADERS = {
+    "User-Agent": "SafetyIntelligenceAPI/1.0"
+}
 
-    params = {
+# Nominatim usage policy: at most one request per second
+nominatim_limiter = RateLimiter(min_interval=1.0)
+_coalescer = Coalescer()
+
+def reverse_geocode_params(lat: float, lon: float):
+    return {
         "format": "json",
         "lat": lat,
         "lon": lon,
@@ -11,14 +24,7 @@ def reverse_geocode(lat: float, lon: float):
         "addressdetails": 1
     }
 
-    headers = {
-        "User-Agent": "SafetyIntelligenceAPI/1.0"
-    }
-
-    response = requests.get(url, params=params, headers=headers, timeout=10)
-    response.raise_for_status()
-
-    data = response.json()
+def parse_location(data):
     address = data.get("address", {})
 
     return {
@@ -29,3 +35,54 @@ def reverse_geocode(lat: float, lon: float):
         "country": address.get("country"),
         "postcode": address.get("postcode")
     }
+
+def _fetch_cell(cell):
+    lat, lon = cell_center(cell)
+    params = reverse_geocode_params(lat, lon)
+
+    nominatim_limiter.wait()
+    response = get_session().get(NOMINATIM_URL, params=params, headers=HEADERS, timeout=10)
+    response.raise_for_status()
+
+    location = parse_location(response.json())
+    geocode_cache.set(cell, location)
+    return location
+
+async def _fetch_cell_async(cell, client):
+    lat, lon = cell_center(cell)
+    params = reverse_geocode_params(lat, lon)
+
+    await nominatim_limiter.wait_async()
+    response = await client.get(NOMINATIM_URL, params=params, headers=HEADERS, timeout=10)
+    response.raise_for_status()
+
+    location = parse_location(response.json())
+    await asyncio.to_thread(geocode_cache.set, cell, location)
+    return location
+
+def reverse_geocode(lat: float, lon: float):
+    """
+    Reverse geocodes a point at zoom 14. Results are cached per grid cell, and
+    concurrent lookups for the same cell share one rate-limited Nominatim request.
+    """
+    cell = snap_to_cell(lat, lon)
+
+    location = geocode_cache.get(cell)
+    if location is not None:
+        return location
+
+    return _coalescer.run(cell, lambda: _fetch_cell(cell))
+
+async def reverse_geocode_async(lat: float, lon: float, client=None):
+    """
+    Async variant of reverse_geocode using the shared httpx.AsyncClient.
+    The SQLite cache is read and written on a worker thread, off the event loop.
+    """
+    client = client or get_async_client()
+    cell = snap_to_cell(lat, lon)
+
+    location = await asyncio.to_thread(geocode_cache.get, cell)
+    if location is not None:
+        return location
+
+    return await _coalescer.run_async(cell, lambda: _fetch_cell_async(cell, client))
@@ -0,0 +1,100 @@
+import threading
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Keep-alive pool size per upstream host; anything else uses DEFAULT_POOL_SIZE
+HOST_POOL_SIZES = {
+    "overpass-api.de": 20,
+    "overpass.kumi.systems": 20,
+    "overpass.nchc.org.tw": 20,
+    "nominatim.openstreetmap.org": 4,
+    "api.gdeltproject.org": 10,
+}
+DEFAULT_POOL_SIZE = 10
+
+# Retries for connection errors and throttling responses, with exponential backoff.
+# POSTs (Overpass) are only retried on connection errors; mirror hedging covers the rest.
+RETRIES = 2
+BACKOFF_FACTOR = 0.5
+RETRY_STATUSES = (429, 502, 503, 504)
+
+_lock = threading.Lock()
+_session = None
+_async_client = None
+
+def _retry_policy():
+    return Retry(
+        total=RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        raise_on_status=False,
+    )
+
+def _build_session(host_pool_sizes):
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_maxsize=DEFAULT_POOL_SIZE, max_retries=_retry_policy()))
+    session.mount("http://", HTTPAdapter(pool_maxsize=DEFAULT_POOL_SIZE, max_retries=_retry_policy()))
+    for host, size in host_pool_sizes.items():
+        session.mount(f"https://{host}/", HTTPAdapter(pool_maxsize=size, max_retries=_retry_policy()))
+    return session
+
+def _build_async_client(host_pool_sizes):
+    mounts = {
+        f"all://{host}": httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(max_connections=size, max_keepalive_connections=size),
+            retries=RETRIES,
+        )
+        for host, size in host_pool_sizes.items()
+    }
+    return httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=DEFAULT_POOL_SIZE, max_keepalive_connections=DEFAULT_POOL_SIZE),
+        transport=httpx.AsyncHTTPTransport(retries=RETRIES),
+        mounts=mounts,
+    )
+
+def open_clients(host_pool_sizes=None):
+    """
+    Creates the shared sync session and async client. Call once at app startup.
+    """
+    global _session, _async_client
+    sizes = dict(HOST_POOL_SIZES, **(host_pool_sizes or {}))
+    with _lock:
+        if _session is None:
+            _session = _build_session(sizes)
+        if _async_client is None:
+            _async_client = _build_async_client(sizes)
+
+async def close_clients():
+    """
+    Closes the shared clients and their pooled connections. Call once at app shutdown.
+    """
+    global _session, _async_client
+    with _lock:
+        session, client = _session, _async_client
+        _session = None
+        _async_client = None
+    if session is not None:
+        session.close()
+    if client is not None:
+        await client.aclose()
+
+def get_session():
+    """
+    Process-wide pooled requests.Session, created on first use if the app did not open it.
+    """
+    if _session is None:
+        open_clients()
+    return _session
+
+def get_async_client():
+    """
+    Process-wide pooled httpx.AsyncClient, created on first use if the app did not open it.
+    The client is bound to the event loop that first uses it.
+    """
+    if _async_client is None:
+        open_clients()
+    return _async_client
@@ -0,0 +1,73 @@
+import zlib
+from collections import Counter
+
+import numpy as np
+
+# MinHash over character shingles, bucketed with LSH banding.
+# 32 bands of 2 rows put two titles in the same bucket with probability > 0.5
+# once their shingle Jaccard similarity passes ~0.15 (> 0.95 at 0.3). Headlines
+# with a SequenceMatcher ratio above 0.6 are typically well past 0.3, but not
+# always, so a few such pairs never get compared.
+SHINGLE_SIZE = 3
+NUM_BANDS = 32
+ROWS_PER_BAND = 2
+NUM_PERM = NUM_BANDS * ROWS_PER_BAND
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, _PRIME, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, size=NUM_PERM, dtype=np.uint64)
+
+def shingles(text: str, size: int = SHINGLE_SIZE):
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+def minhash_signature(text: str):
+    hashes = np.fromiter(
+        (zlib.crc32(s.encode("utf-8")) % _PRIME for s in shingles(text)), dtype=np.uint64
+    )
+    # (a * h + b) mod p for every permutation/shingle pair; a, h < 2^31 so this fits in uint64
+    return ((_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME).min(axis=1)
+
+class NearDuplicateIndex:
+    """
+    Greedy near-duplicate filter in close to linear time.
+
+    LSH buckets narrow each new title down to a handful of previously kept
+    titles; only those are compared with the exact `similar` function. A kept
+    title that shares no bucket is never compared, so the result approximates
+    the all-pairs greedy filter rather than matching it exactly.
+    """
+
+    def __init__(self, similar, threshold: float):
+        self.similar = similar
+        self.threshold = threshold
+        self.titles = []
+        self._buckets = [{} for _ in range(NUM_BANDS)]
+
+    def _band_keys(self, signature):
+        bands = signature.reshape(NUM_BANDS, ROWS_PER_BAND)
+        return [band.tobytes() for band in bands]
+
+    def add_if_new(self, title: str):
+        """
+        Keeps the title unless it is too similar to one already kept.
+        Returns True if the title was kept.
+        """
+        band_keys = self._band_keys(minhash_signature(title))
+
+        # Kept titles sharing the most bands are the likeliest duplicates, so check those first
+        collisions = Counter()
+        for buckets, key in zip(self._buckets, band_keys):
+            collisions.update(buckets.get(key, ()))
+
+        for index, _ in collisions.most_common():
+            if self.similar(title, self.titles[index]) > self.threshold:
+                return False
+
+        index = len(self.titles)
+        self.titles.append(title)
+        for buckets, key in zip(self._buckets, band_keys):
+            buckets.setdefault(key, []).append(index)
+        return True
@@ -1,30 +1,39 @@
-import requests
+import asyncio
+import os
 from difflib import SequenceMatcher
 
+from .cache import StaleWhileRevalidateCache
+from .http_client import get_async_client, get_session
+from .near_duplicates import NearDuplicateIndex
+
+GDELT_URL = "https://api.gdeltproject.org/api/v2/doc/doc"
+
+HEADERS = {"User-Agent": "SafetyIntelligenceAPI/2.0"}
+
+# Crime counts over a 3 month window barely move hour to hour: serve them from
+# cache for NEWS_CACHE_TTL seconds, then serve stale while refreshing in the background
+NEWS_CACHE_TTL = float(os.environ.get("NEWS_CACHE_TTL", 6 * 3600))
+NEWS_CACHE_MAX_STALE = float(os.environ.get("NEWS_CACHE_MAX_STALE", 7 * 24 * 3600))
+
+news_cache = StaleWhileRevalidateCache(ttl=NEWS_CACHE_TTL, max_stale=NEWS_CACHE_MAX_STALE, maxsize=2048)
+
 def similar(a, b):
     """Calculates similarity between two headlines (0.0 to 1.0)."""
     return SequenceMatcher(None, a, b).ratio()
 
-def get_crime_news_count(location_name: str, country_code: str = "IN"):
-    """
-    Fetches accurate crime news counts by:
-    1. Fetching up to 250 articles (API Max).
-    2. Filtering by Country (e.g., India only).
-    3. Removing duplicate articles about the same event.
-    """
-    if not location_name:
-        return 0
+def clean_location(location_name: str):
+    """Keeps only the city part of a location name."""
+    return location_name.split(',')[0].strip()
 
-    # 1. Clean the city name
-    clean_city = location_name.split(',')[0].strip()
+def news_cache_key(clean_city: str, country_code: str):
+    return (clean_city.lower(), country_code.upper())
 
-    # 2. Strict Query: 
+def crime_news_params(clean_city: str, country_code: str = "IN"):
+    # Strict Query:
     # (Crime Keyword) AND (City Name) AND (Source Country)
     query = f'(crime OR robbery OR murder OR assault OR "police arrest" OR rape OR theft) "{clean_city}" sourcecountry:{country_code}'
 
-    url = "https://api.gdeltproject.org/api/v2/doc/doc"
-
-    params = {
+    return {
         "query": query,
         "mode": "ArtList",
         "format": "json",
@@ -33,39 +42,91 @@ def get_crime_news_count(location_name: str, country_code: str = "IN"):
         "sort": "datedesc"
     }
 
+def count_unique_events(clean_city: str, articles):
+    """
+    Removes duplicate articles about the same event and returns how many are left.
+    """
+    # Deduplication Logic (The "Accuracy" Fix)
+    # Skip a title if it is too similar (>60%) to one we already counted;
+    # MinHash/LSH picks the few kept titles worth comparing against. This
+    # approximates comparing against every kept title: a pair just over 60%
+    # with little shingle overlap can be missed and counted as two events
+    # (on the benchmark fixtures: 11 of 1647 such pairs, at most one extra event)
+    index = NearDuplicateIndex(similar, threshold=0.6)
+    unique_events = [
+        article for article in articles
+        if index.add_if_new(article.get("title", "").lower())
+    ]
+
+    # Debug print to verify it's working in your terminal
+    print(f"DEBUG: {clean_city} -> Fetched {len(articles)} articles, found {len(unique_events)} unique events.")
+
+    return len(unique_events)
+
+def _fetch_count(clean_city: str, country_code: str):
+    """Fetches and deduplicates articles; None if GDELT could not be reached."""
+    params = crime_news_params(clean_city, country_code)
+
+    try:
+        response = get_session().get(GDELT_URL, params=params, headers=HEADERS, timeout=15)
+
+        if response.status_code != 200:
+            return None
+
+        data = response.json()
+        return count_unique_events(clean_city, data.get("articles", []))
+
+    except Exception as e:
+        print(f"NEWS ERROR: {e}")
+        return None
+
+async def _fetch_count_async(clean_city: str, country_code: str, client):
+    params = crime_news_params(clean_city, country_code)
+
     try:
-        headers = {"User-Agent": "SafetyIntelligenceAPI/2.0"}
-        response = requests.get(url, params=params, headers=headers, timeout=15)
-        
+        response = await client.get(GDELT_URL, params=params, headers=HEADERS, timeout=15)
+
         if response.status_code != 200:
-            return 0
+            return None
 
         data = response.json()
-        articles = data.get("articles", [])
-
-        # 3. Deduplication Logic (The "Accuracy" Fix)
-        unique_events = []
-        seen_titles = []
-
-        for article in articles:
-            title = article.get("title", "").lower()
-            
-            # Skip if title is too similar (>60%) to one we already counted
-            is_duplicate = False
-            for seen in seen_titles:
-                if similar(title, seen) > 0.6: 
-                    is_duplicate = True
-                    break
-            
-            if not is_duplicate:
-                unique_events.append(article)
-                seen_titles.append(title)
-
-        # Debug print to verify it's working in your terminal
-        print(f"DEBUG: {clean_city} -> Fetched {len(articles)} articles, found {len(unique_events)} unique events.")
-        
-        return len(unique_events)
+        # The dedup is CPU-bound; keep it off the event loop
+        return await asyncio.to_thread(count_unique_events, clean_city, data.get("articles", []))
 
     except Exception as e:
         print(f"NEWS ERROR: {e}")
-        return 0
\ No newline at end of file
+        return None
+
+def get_crime_news_count(location_name: str, country_code: str = "IN"):
+    """
+    Fetches accurate crime news counts by:
+    1. Fetching up to 250 articles (API Max).
+    2. Filtering by Country (e.g., India only).
+    3. Removing duplicate articles about the same event.
+    Counts are cached per city; stale counts are served while a refresh runs in the background.
+    """
+    if not location_name:
+        return 0
+
+    clean_city = clean_location(location_name)
+    count = news_cache.get_or_fetch(
+        news_cache_key(clean_city, country_code),
+        lambda: _fetch_count(clean_city, country_code),
+    )
+    return count or 0
+
+async def get_crime_news_count_async(location_name: str, country_code: str = "IN", client=None):
+    """
+    Async variant of get_crime_news_count using the shared httpx.AsyncClient.
+    """
+    if not location_name:
+        return 0
+
+    client = client or get_async_client()
+
+    clean_city = clean_location(location_name)
+    count = await news_cache.get_or_fetch_async(
+        news_cache_key(clean_city, country_code),
+        lambda: _fetch_count_async(clean_city, country_code, client),
+    )
+    return count or 0
@@ -0,0 +1,336 @@
+"""
+Offline OpenStreetMap backend: a tile-bucketed SQLite index built from a
+regional extract, answering the feature store without any Overpass calls.
+
+Build an index from the Safety folder:
+    python -m services.osm_extract india-latest.osm.pbf cache/osm_extract.sqlite3
+
+.osm.pbf / .osm files need pyosmium (pip install osmium). An Overpass JSON
+dump made with `out geom` (or `out tags bb`, without way geometry) can be
+ingested without it, e.g. for fixtures.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .tile_cache import TILE_DEG, feature_from_element, line_geometry, tile_bounds, tile_of
+
+# Features spanning more tiles than this (large forests, lakes, districts) are kept
+# once in a separate list instead of being repeated in every tile they cover
+MAX_FEATURE_TILES = 2500
+
+# Rows per executemany batch while ingesting
+INGEST_BATCH = 10000
+
+# Let SQLite memory-map this much of the index for reads
+MMAP_BYTES = 1 << 30
+
+ELEMENT_TYPES = ("node", "way", "relation")
+
+SCHEMA = (
+    "CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+    "CREATE TABLE features ("
+    " id INTEGER PRIMARY KEY,"
+    " type INTEGER NOT NULL,"
+    " osm_id INTEGER NOT NULL,"
+    " lat REAL NOT NULL,"
+    " lon REAL NOT NULL,"
+    " minlat REAL, minlon REAL, maxlat REAL, maxlon REAL,"
+    " tags TEXT NOT NULL,"
+    " geometry BLOB)",
+    "CREATE TABLE tile_features ("
+    " row INTEGER NOT NULL,"
+    " col INTEGER NOT NULL,"
+    " feature INTEGER NOT NULL,"
+    " PRIMARY KEY (row, col, feature)) WITHOUT ROWID",
+    "CREATE TABLE large_features (feature INTEGER PRIMARY KEY)",
+)
+
+def feature_matches(element_type, tags, filters):
+    """Whether an element passes any (element types, key, value) filter."""
+    return any(
+        element_type in element_types and key in tags and (value is None or tags[key] == value)
+        for element_types, key, value in filters
+    )
+
+def feature_tile_range(feature):
+    """(south, west, north, east) tile rows/cols a feature touches."""
+    box = feature["bounds"]
+    if box is None:
+        row, col = tile_of(feature["lat"], feature["lon"])
+        return row, col, row, col
+    south, west = tile_of(box[0], box[1])
+    north, east = tile_of(box[2], box[3])
+    return south, west, north, east
+
+def read_overpass_json(path, filters, add):
+    """Passes the matching features of an Overpass JSON dump (`out geom`, `out tags bb` or `out center`) to `add`."""
+    with open(path, encoding="utf-8") as f:
+        elements = json.load(f).get("elements", [])
+    for element in elements:
+        if feature_matches(element.get("type"), element.get("tags", {}), filters):
+            feature = feature_from_element(element)
+            if feature is not None:
+                add(feature)
+
+def read_osm_file(path, filters, add):
+    """
+    Passes the matching features of a .osm.pbf / .osm extract to `add`, streaming
+    via pyosmium. Ways get their bounds and geometry from node locations;
+    multipolygon relations from their rings.
+    """
+    try:
+        import osmium
+    except ImportError:
+        raise SystemExit("Reading .osm.pbf extracts needs pyosmium: pip install osmium")
+
+    keys = {key for _, key, _ in filters}
+
+    def wanted(element_type, osm_tags):
+        if not any(tag.k in keys for tag in osm_tags):
+            return None
+        tags = {tag.k: tag.v for tag in osm_tags}
+        return tags if feature_matches(element_type, tags, filters) else None
+
+    def bounded(element_type, osm_id, parts, tags):
+        lats = [lat for part in parts for lat, _ in part]
+        lons = [lon for part in parts for _, lon in part]
+        if not lats:
+            return
+        feature = feature_from_element({
+            "type": element_type,
+            "id": osm_id,
+            "bounds": {"minlat": min(lats), "minlon": min(lons), "maxlat": max(lats), "maxlon": max(lons)},
+            "tags": tags,
+        })
+        feature["geometry"] = line_geometry(parts)
+        add(feature)
+
+    class Handler(osmium.SimpleHandler):
+        def node(self, n):
+            tags = wanted("node", n.tags)
+            if tags is not None and n.location.valid():
+                add({
+                    "type": "node", "id": n.id, "lat": n.location.lat, "lon": n.location.lon,
+                    "bounds": None, "tags": tags,
+                })
+
+        def way(self, w):
+            tags = wanted("way", w.tags)
+            if tags is not None:
+                bounded("way", w.id, [[(nd.lat, nd.lon) for nd in w.nodes if nd.location.valid()]], tags)
+
+        def area(self, a):
+            # Closed ways are handled by way(); only multipolygon relations are taken from here
+            if a.from_way():
+                return
+            tags = wanted("relation", a.tags)
+            if tags is not None:
+                rings = []
+                for outer in a.outer_rings():
+                    rings.append(outer)
+                    rings.extend(a.inner_rings(outer))
+                parts = [[(nd.lat, nd.lon) for nd in ring if nd.location.valid()] for ring in rings]
+                bounded("relation", a.orig_id(), parts, tags)
+
+    Handler().apply_file(str(path), locations=True)
+
+class IndexWriter:
+    """Writes features into a new index file in batches."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.count = 0
+        self._features, self._tiles, self._large = [], [], []
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute("PRAGMA journal_mode = OFF")
+        self._conn.execute("PRAGMA synchronous = OFF")
+        for statement in SCHEMA:
+            self._conn.execute(statement)
+
+    def add(self, feature):
+        self.count += 1
+        box = feature["bounds"] or (None, None, None, None)
+        self._features.append((
+            self.count, ELEMENT_TYPES.index(feature["type"]), feature["id"], feature["lat"], feature["lon"],
+            *box, json.dumps(feature["tags"], ensure_ascii=False, separators=(",", ":")),
+            None if feature["geometry"] is None else feature["geometry"].tobytes(),
+        ))
+
+        south, west, north, east = feature_tile_range(feature)
+        if (north - south + 1) * (east - west + 1) > MAX_FEATURE_TILES:
+            self._large.append((self.count,))
+        else:
+            self._tiles.extend(
+                (row, col, self.count) for row in range(south, north + 1) for col in range(west, east + 1)
+            )
+
+        if len(self._features) >= INGEST_BATCH:
+            self.flush()
+
+    def flush(self):
+        self._conn.executemany("INSERT INTO features VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", self._features)
+        self._conn.executemany("INSERT OR IGNORE INTO tile_features VALUES (?, ?, ?)", self._tiles)
+        self._conn.executemany("INSERT INTO large_features VALUES (?)", self._large)
+        self._features.clear()
+        self._tiles.clear()
+        self._large.clear()
+
+    def close(self, meta):
+        self.flush()
+        self._conn.executemany("INSERT INTO meta VALUES (?, ?)", meta.items())
+        self._conn.commit()
+        self._conn.close()
+
+def ingest(source, out_path, filters):
+    """
+    Builds an extract index at `out_path` from `source` and returns the number
+    of features stored. The index is written to a temporary file and moved into
+    place, so a running service never sees a half-built index.
+    """
+    source = Path(source)
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = out_path.with_suffix(out_path.suffix + ".tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    writer = IndexWriter(tmp_path)
+    try:
+        if source.suffix == ".json":
+            read_overpass_json(source, filters, writer.add)
+        else:
+            read_osm_file(source, filters, writer.add)
+    except BaseException:
+        writer.close({})
+        tmp_path.unlink()
+        raise
+
+    writer.close({
+        "tile_deg": str(TILE_DEG),
+        "source": source.name,
+        "created_at": str(time.time()),
+        "filters": json.dumps(filters),
+        "features": str(writer.count),
+    })
+
+    os.replace(tmp_path, out_path)
+    return writer.count
+
+def _feature_from_row(row, tags=None):
+    element_type, osm_id, lat, lon, minlat, minlon, maxlat, maxlon, tags_json, geometry = row
+    return {
+        "type": ELEMENT_TYPES[element_type],
+        "id": osm_id,
+        "lat": lat,
+        "lon": lon,
+        "bounds": None if minlat is None else (minlat, minlon, maxlat, maxlon),
+        "geometry": None if geometry is None else np.frombuffer(geometry).reshape(-1, 2),
+        "tags": json.loads(tags_json) if tags is None else tags,
+    }
+
+class OSMExtractIndex:
+    """
+    Read-only, memory-mapped view of an index built by `ingest`.
+    Answers per-tile feature lookups with one indexed range scan per tile.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.reads = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        self._conn.execute(f"PRAGMA mmap_size = {MMAP_BYTES}")
+
+        self.meta = dict(self._conn.execute("SELECT key, value FROM meta"))
+        if float(self.meta["tile_deg"]) != TILE_DEG:
+            raise ValueError(f"{self.path} was built for {self.meta['tile_deg']} degree tiles, not {TILE_DEG}")
+        if "geometry" not in {column[1] for column in self._conn.execute("PRAGMA table_info(features)")}:
+            raise ValueError(f"{self.path} was built without way geometry; rebuild it with `python -m services.osm_extract`")
+
+        self.filters = [(tuple(types), key, value) for types, key, value in json.loads(self.meta["filters"])]
+        self.large_features = [
+            _feature_from_row(row) for row in self._conn.execute(
+                "SELECT type, osm_id, lat, lon, minlat, minlon, maxlat, maxlon, tags, geometry FROM features"
+                " WHERE id IN (SELECT feature FROM large_features)"
+            )
+        ]
+
+    def read(self, tiles, filters=None):
+        """
+        {tile: [feature, ...]} for every requested tile. With `filters`, only
+        the features passing them are decoded and returned.
+        """
+        keys = None if filters is None else {key for _, key, _ in filters}
+
+        def wanted(element_type, tags):
+            # A key check first skips most of each feature's non-matching filters
+            return keys is None or (not keys.isdisjoint(tags) and feature_matches(element_type, tags, filters))
+
+        with self._lock:
+            rows = {
+                tile: self._conn.execute(
+                    "SELECT f.type, f.osm_id, f.lat, f.lon, f.minlat, f.minlon, f.maxlat, f.maxlon, f.tags, f.geometry"
+                    " FROM tile_features t JOIN features f ON f.id = t.feature"
+                    " WHERE t.row = ? AND t.col = ?",
+                    tile,
+                ).fetchall()
+                for tile in tiles
+            }
+            self.reads += len(tiles)
+
+        large = [feature for feature in self.large_features if wanted(feature["type"], feature["tags"])]
+        found = {}
+        for tile, tile_rows in rows.items():
+            features = found[tile] = []
+            for row in tile_rows:
+                tags = json.loads(row[8])
+                if wanted(ELEMENT_TYPES[row[0]], tags):
+                    features.append(_feature_from_row(row, tags))
+
+            south, west, north, east = tile_bounds(tile)
+            features.extend(
+                feature for feature in large
+                if feature["bounds"][0] <= north and feature["bounds"][2] >= south
+                and feature["bounds"][1] <= east and feature["bounds"][3] >= west
+            )
+        return found
+
+    def stats(self):
+        return {
+            "path": str(self.path),
+            "source": self.meta.get("source"),
+            "features": int(self.meta.get("features", 0)),
+            "large_features": len(self.large_features),
+            "tile_reads": self.reads,
+        }
+
+def open_extract(path):
+    """The extract index at `path`, or None when no usable index is configured."""
+    if not path:
+        return None
+    if not Path(path).exists():
+        print(f"OSM extract not found at {path}; falling back to Overpass")
+        return None
+    return OSMExtractIndex(path)
+
+def main(argv=None):
+    from .feature_store import default_filters
+
+    parser = argparse.ArgumentParser(description="Build an offline OSM feature index from a regional extract.")
+    parser.add_argument("source", help=".osm.pbf / .osm extract, or an Overpass JSON dump")
+    parser.add_argument("output", help="Index file to write, e.g. cache/osm_extract.sqlite3")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    count = ingest(args.source, args.output, default_filters())
+    print(f"Indexed {count} features into {args.output} in {time.perf_counter() - start:.1f} s")
+
+if __name__ == "__main__":
+    main()
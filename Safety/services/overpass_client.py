@@ -0,0 +1,384 @@
+import asyncio
+import codecs
+import json
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .http_client import get_async_client, get_session
+
+OVERPASS_URLS = [
+    "https://overpass-api.de/api/interpreter",
+    "https://overpass.kumi.systems/api/interpreter",
+    "https://overpass.nchc.org.tw/api/interpreter"
+]
+
+# Element fields the services read; metadata (user, version, timestamp, changeset)
+# and node id lists are dropped while a response is parsed
+ELEMENT_FIELDS = ("type", "id", "lat", "lon", "center", "bounds", "tags", "geometry", "members")
+
+# Bytes read from the connection at a time while a response is parsed
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# The async client hands the parser this much at a time on a worker thread
+ASYNC_FEED_SIZE = 1024 * 1024
+
+_ELEMENT_FIELD_SET = frozenset(ELEMENT_FIELDS)
+_SEPARATORS = re.compile(r"[\s,]*")
+
+class ElementStream:
+    """
+    Incremental parser for an Overpass JSON response. Elements are decoded as
+    bytes arrive and only ELEMENT_FIELDS are kept, so the body is never held in
+    memory as a whole.
+
+    This is a memory trade-off, not a speed-up: on a 35 MB body it peaks at
+    about 120 MB against 190 MB for json.loads, but parses 10-15% slower
+    (benchmarks/bench_overpass_parse.py). Batched decoding relies on Overpass
+    ending every element with a line "}"; other layouts are still parsed
+    correctly, one element at a time, but about twice as slowly.
+    """
+
+    def __init__(self):
+        self.elements = []
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._in_elements = False
+        self._done = False
+        # After an element was cut off, wait until the buffer has doubled before retrying,
+        # so a huge element is not re-decoded for every chunk
+        self._retry_at = 0
+
+    def feed(self, chunk: bytes):
+        if self._done:
+            # Only top-level fields such as "remark" follow the elements
+            return
+        self._buffer += self._text.decode(chunk)
+        if len(self._buffer) >= self._retry_at:
+            self._parse()
+
+    def _parse(self):
+        buffer = self._buffer
+        pos = 0
+        if not self._in_elements:
+            start = buffer.find('"elements"')
+            bracket = buffer.find("[", start) if start >= 0 else -1
+            if bracket < 0:
+                return
+            self._in_elements = True
+            pos = bracket + 1
+
+        scan = self._decoder.scan_once
+        skip = _SEPARATORS.match
+        end = len(buffer)
+        batched = False
+        while True:
+            pos = skip(buffer, pos).end()
+            if pos == end:
+                break
+            if buffer[pos] == "]":
+                self._done = True
+                break
+
+            # Overpass starts every element on a new line and ends it with "\n}". Raw newlines
+            # cannot occur inside JSON strings, so the complete elements up to the last one are
+            # decoded in a single scanner call (which also shares repeated keys between them)
+            cut = -1 if batched else buffer.rfind("\n}", pos)
+            batched = True
+            if cut > pos:
+                batch = "[" + buffer[pos:cut + 2] + "]"
+                try:
+                    elements, batch_end = scan(batch, 0)
+                except (StopIteration, json.JSONDecodeError):
+                    batch_end = None
+                if batch_end == len(batch):
+                    self._add(elements)
+                    pos = cut + 2
+                    self._retry_at = 0
+                    continue
+
+            try:
+                element, pos = scan(buffer, pos)
+            except (StopIteration, json.JSONDecodeError):
+                self._retry_at = 2 * (end - pos)
+                break
+            self._add([element])
+            self._retry_at = 0
+
+        self._buffer = "" if self._done else buffer[pos:]
+
+    def _add(self, elements):
+        append = self.elements.append
+        for element in elements:
+            # Most elements carry nothing else; only rebuild the ones that do
+            if element.keys() - _ELEMENT_FIELD_SET:
+                element = {key: element[key] for key in ELEMENT_FIELDS if key in element}
+            append(element)
+
+    def close(self):
+        """The parsed response as {"elements": [...]}; raises if it was cut off."""
+        if not self._done:
+            self._buffer += self._text.decode(b"", final=True)
+            self._parse()
+        if not self._done:
+            raise ValueError("Incomplete Overpass response")
+        return {"elements": self.elements}
+
+class MirrorStats:
+    """
+    Rolling latency and failure record for one Overpass mirror.
+    """
+
+    def __init__(self, url: str, window: int = 50):
+        self.url = url
+        self.latencies = deque(maxlen=window)
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_failure = 0.0
+
+    def record_success(self, latency: float):
+        self.latencies.append(latency)
+        self.successes += 1
+        self.consecutive_failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_failure = time.monotonic()
+
+    def percentile(self, pct: float):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def in_cooldown(self, cooldown: float):
+        """A failing mirror is demoted for longer the more often it fails in a row."""
+        if not self.consecutive_failures:
+            return False
+        return time.monotonic() - self.last_failure < cooldown * self.consecutive_failures
+
+    def as_dict(self):
+        return {
+            "url": self.url,
+            "successes": self.successes,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "p50_latency": self.percentile(50),
+            "p90_latency": self.percentile(90),
+        }
+
+class MirrorRace:
+    """
+    Open responses of one sync query's mirror requests, so the losing ones can
+    be closed as soon as a mirror wins instead of being downloaded to the end.
+    """
+
+    def __init__(self):
+        self.finished = False
+        self._responses = set()
+        self._lock = threading.Lock()
+
+    def track(self, response):
+        """Registers a response; False if the race is already over."""
+        with self._lock:
+            if self.finished:
+                return False
+            self._responses.add(response)
+            return True
+
+    def untrack(self, response):
+        with self._lock:
+            self._responses.discard(response)
+
+    def finish(self):
+        with self._lock:
+            self.finished = True
+            responses, self._responses = self._responses, set()
+        for response in responses:
+            response.close()
+
+class OverpassClient:
+    """
+    Shared Overpass client that races mirrors instead of failing over one by one.
+
+    The fastest healthy mirror is tried first. If it has not answered after the
+    hedge delay (its recent p90 latency unless a fixed delay is configured), the
+    next mirror is queried as well and the first successful response wins.
+    """
+
+    def __init__(self, urls=OVERPASS_URLS, hedge_delay: float = None, default_hedge_delay: float = 2.0,
+                 min_hedge_delay: float = 0.5, max_hedge_delay: float = 10.0, min_samples: int = 5,
+                 cooldown: float = 30.0, max_workers: int = 32):
+        self.urls = list(urls)
+        self.hedge_delay = hedge_delay
+        self.default_hedge_delay = default_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedge_delay = max_hedge_delay
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self._stats = {url: MirrorStats(url) for url in self.urls}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="overpass")
+
+    def ordered_urls(self):
+        """Mirrors ordered by health: mirrors in cooldown last, then by median latency."""
+        with self._lock:
+            def rank(item):
+                position, url = item
+                stats = self._stats[url]
+                p50 = stats.percentile(50)
+                return (stats.in_cooldown(self.cooldown), p50 if p50 is not None else float("inf"), position)
+
+            return [url for _, url in sorted(enumerate(self.urls), key=rank)]
+
+    def delay_for(self, url: str):
+        """How long to wait on a mirror before hedging to the next one."""
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        with self._lock:
+            stats = self._stats[url]
+            if len(stats.latencies) < self.min_samples:
+                return self.default_hedge_delay
+            p90 = stats.percentile(90)
+        return min(self.max_hedge_delay, max(self.min_hedge_delay, p90))
+
+    def stats(self):
+        with self._lock:
+            return [self._stats[url].as_dict() for url in self.urls]
+
+    def _record(self, url: str, started: float, ok: bool):
+        with self._lock:
+            if ok:
+                self._stats[url].record_success(time.monotonic() - started)
+            else:
+                self._stats[url].record_failure()
+
+    def _fetch(self, url: str, query: str, timeout: float, race: MirrorRace = None):
+        started = time.monotonic()
+        try:
+            with get_session().post(url, data={"data": query}, timeout=timeout, stream=True) as response:
+                if race is not None and not race.track(response):
+                    return None
+                try:
+                    if response.status_code != 200:
+                        self._record(url, started, False)
+                        return None
+                    stream = ElementStream()
+                    for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                        stream.feed(chunk)
+                    data = stream.close()
+                finally:
+                    if race is not None:
+                        race.untrack(response)
+        except Exception as e:
+            if race is not None and race.finished:
+                # Closed because another mirror won; not the mirror's fault
+                return None
+            print(f"Overpass Error ({url}): {e}")
+            self._record(url, started, False)
+            return None
+
+        self._record(url, started, True)
+        return data
+
+    async def _fetch_async(self, url: str, query: str, client, timeout: float):
+        started = time.monotonic()
+        try:
+            async with client.stream("POST", url, data={"data": query}, timeout=timeout) as response:
+                if response.status_code != 200:
+                    self._record(url, started, False)
+                    return None
+                # Parsing is CPU-bound, so it runs on a worker thread in ~1 MB steps
+                stream = ElementStream()
+                pending = bytearray()
+                async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+                    pending += chunk
+                    if len(pending) >= ASYNC_FEED_SIZE:
+                        await asyncio.to_thread(stream.feed, bytes(pending))
+                        pending.clear()
+                await asyncio.to_thread(stream.feed, bytes(pending))
+                data = await asyncio.to_thread(stream.close)
+        except asyncio.CancelledError:
+            # Lost the race; not the mirror's fault
+            raise
+        except Exception as e:
+            print(f"Overpass Error ({url}): {e}")
+            self._record(url, started, False)
+            return None
+
+        self._record(url, started, True)
+        return data
+
+    def query(self, query: str, timeout: float = 30):
+        """
+        Runs an Overpass query, hedging across mirrors.
+        Returns the response elements (trimmed to ELEMENT_FIELDS) as {"elements": [...]},
+        or None if every mirror failed.
+        """
+        urls = self.ordered_urls()
+        next_index = 0
+        pending = set()
+        race = MirrorRace()
+
+        while True:
+            if next_index < len(urls):
+                url = urls[next_index]
+                pending.add(self._executor.submit(self._fetch, url, query, timeout, race))
+                next_index += 1
+                delay = self.delay_for(url) if next_index < len(urls) else None
+            elif not pending:
+                return None
+            else:
+                delay = None
+
+            # Wait for a response, or until it is time to hedge to the next mirror
+            done, pending = wait(pending, timeout=delay, return_when=FIRST_COMPLETED)
+            for future in done:
+                data = future.result()
+                if data is not None:
+                    # Close the losing responses and drop whatever has not started; a request
+                    # still waiting for its response headers is closed as soon as they arrive
+                    race.finish()
+                    for other in pending:
+                        other.cancel()
+                    return data
+
+    async def query_async(self, query: str, timeout: float = 30, client=None):
+        """
+        Async variant of query using the shared httpx.AsyncClient.
+        Losing requests are cancelled as soon as one mirror answers.
+        """
+        client = client or get_async_client()
+        urls = self.ordered_urls()
+        next_index = 0
+        pending = set()
+
+        try:
+            while True:
+                if next_index < len(urls):
+                    url = urls[next_index]
+                    pending.add(asyncio.ensure_future(self._fetch_async(url, query, client, timeout)))
+                    next_index += 1
+                    delay = self.delay_for(url) if next_index < len(urls) else None
+                elif not pending:
+                    return None
+                else:
+                    delay = None
+
+                done, pending = await asyncio.wait(pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    data = task.result()
+                    if data is not None:
+                        return data
+        finally:
+            for task in pending:
+                task.cancel()
+
+# Process-wide client so mirror health is shared by every caller
+overpass = OverpassClient()
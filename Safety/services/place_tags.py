@@ -0,0 +1,78 @@
+PLACE_ELEMENT_TYPES = ("node", "way", "relation")
+
+# Overpass tag filters per place type; unknown types fall back to ["amenity"="<type>"]
+PLACE_TAGS = {
+    "hospital": [
+        '["amenity"="hospital"]',
+        '["healthcare"="hospital"]',
+        '["amenity"="clinic"]',
+        '["healthcare"="clinic"]'
+    ],
+    "police": [
+        '["amenity"="police"]',
+        '["government"="public_safety"]'
+    ],
+    "fire_station": [
+        '["amenity"="fire_station"]',
+        '["emergency"="fire_station"]'
+    ],
+    "school": [
+        '["amenity"="school"]',
+        '["amenity"="university"]',
+        '["amenity"="college"]',
+        '["amenity"="kindergarten"]'
+    ],
+    "bank": [
+        '["amenity"="bank"]',
+        '["amenity"="atm"]'
+    ],
+    "atm": [
+        '["amenity"="atm"]'
+    ],
+    "pharmacy": [
+        '["amenity"="pharmacy"]',
+        '["healthcare"="pharmacy"]'
+    ],
+    "restaurant": [
+        '["amenity"="restaurant"]',
+        '["amenity"="cafe"]',
+        '["amenity"="fast_food"]'
+    ],
+    "fuel": [
+        '["amenity"="fuel"]'
+    ],
+    "marketplace": [
+        '["amenity"="marketplace"]',
+        '["amenity"="supermarket"]'
+    ]
+}
+
+def get_place_tags(place_type: str):
+    """
+    Returns Overpass API tags for different place types.
+    """
+    return PLACE_TAGS.get(place_type, [f'["amenity"="{place_type}"]'])
+
+def parse_place_tag(tag: str):
+    """
+    Splits an Overpass tag filter like '["amenity"="hospital"]' into (key, value).
+    """
+    key, _, value = tag.strip("[]").partition("=")
+    return key.strip('"'), value.strip('"')
+
+def union_place_tags(place_types):
+    """
+    Union of every category's tag filters, each filter only once.
+    """
+    tags = []
+    for place_type in place_types:
+        for tag in get_place_tags(place_type):
+            if tag not in tags:
+                tags.append(tag)
+    return tags
+
+def place_filters(place_type: str):
+    """
+    Tag filters of a place type as feature-store filters: (element types, key, value).
+    """
+    return [(PLACE_ELEMENT_TYPES, *parse_place_tag(tag)) for tag in get_place_tags(place_type)]
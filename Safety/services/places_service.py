@@ -1,164 +1,183 @@
-import requests
 import math
 
-OVERPASS_URLS = [
-    "https://overpass-api.de/api/interpreter",
-    "https://overpass.kumi.systems/api/interpreter",
-    "https://overpass.nchc.org.tw/api/interpreter"
-]
-
-def haversine_distance(lat1, lon1, lat2, lon2):
-    """
-    Calculates distance between two points in meters.
-    Used to detect if two 'places' are actually the same building.
-    """
-    R = 6371000  # Earth radius in meters
-    phi1, phi2 = math.radians(lat1), math.radians(lat2)
-    dphi = math.radians(lat2 - lat1)
-    dlambda = math.radians(lon2 - lon1)
-
-    a = math.sin(dphi / 2)**2 + \
-        math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-
-    return R * c
-
-def get_place_tags(place_type: str):
-    """
-    Returns Overpass API tags for different place types.
-    """
-    tag_map = {
-        "hospital": [
-            '["amenity"="hospital"]',
-            '["healthcare"="hospital"]',
-            '["amenity"="clinic"]',
-            '["healthcare"="clinic"]'
-        ],
-        "police": [
-            '["amenity"="police"]',
-            '["government"="public_safety"]'
-        ],
-        "fire_station": [
-            '["amenity"="fire_station"]',
-            '["emergency"="fire_station"]'
-        ],
-        "school": [
-            '["amenity"="school"]',
-            '["amenity"="university"]',
-            '["amenity"="college"]',
-            '["amenity"="kindergarten"]'
-        ],
-        "bank": [
-            '["amenity"="bank"]',
-            '["amenity"="atm"]'
-        ],
-        "atm": [
-            '["amenity"="atm"]'
-        ],
-        "pharmacy": [
-            '["amenity"="pharmacy"]',
-            '["healthcare"="pharmacy"]'
-        ],
-        "restaurant": [
-            '["amenity"="restaurant"]',
-            '["amenity"="cafe"]',
-            '["amenity"="fast_food"]'
-        ],
-        "fuel": [
-            '["amenity"="fuel"]'
-        ],
-        "marketplace": [
-            '["amenity"="marketplace"]',
-            '["amenity"="supermarket"]'
-        ]
-    }
-    return tag_map.get(place_type, [f'["amenity"="{place_type}"]'])
+import numpy as np
 
-def get_nearby_places(lat: float, lon: float, place_type: str, radius: int = 1500):
+from .feature_store import features_within, osm_features
+from .geo import haversine_distance, haversine_distances
+from .overpass_client import overpass
+from .place_tags import place_filters, union_place_tags
+from .tile_cache import element_location, tiles_bbox, tiles_covering
+
+# Places closer than this are treated as the same building
+DEDUP_DISTANCE = 50
+
+# Meters per degree of latitude (and of longitude at the equator) on the haversine sphere
+METERS_PER_DEGREE = 6371000 * math.pi / 180
+
+def dedup_grid_cells(lats, lons):
     """
-    Gets detailed information about nearby places within a radius.
-    Returns a list of places with name, coordinates, and distance.
-    Deduplicates results that are within 50 meters of each other.
+    Spatial hash cells at least DEDUP_DISTANCE wide, so any two points closer
+    than that are in the same or adjacent cells.
+    """
+    # A small margin absorbs the flat-earth approximation at these distances
+    cell_lat = DEDUP_DISTANCE * 1.01 / METERS_PER_DEGREE
+    max_cos = max(math.cos(math.radians(float(np.max(np.abs(lats))))), 1e-6)
+    cell_lon = cell_lat / max_cos
+
+    rows = np.floor(lats / cell_lat).astype(np.int64)
+    cols = np.floor(lons / cell_lon).astype(np.int64)
+    return rows.tolist(), cols.tolist()
+
+def build_tiles_query(tiles, tags):
     """
-    tags = get_place_tags(place_type)
-    
+    Builds a single Overpass union query for the given tag filters over the
+    bounding box of a set of cache tiles.
+    """
+    south, west, north, east = tiles_bbox(tiles)
+    bbox = f"({south:.5f},{west:.5f},{north:.5f},{east:.5f})"
+
     # Build the query parts dynamically
     query_parts = ""
     for tag in tags:
         query_parts += f"""
-        node{tag}(around:{radius},{lat},{lon});
-        way{tag}(around:{radius},{lat},{lon});
-        relation{tag}(around:{radius},{lat},{lon});
+        node{tag}{bbox};
+        way{tag}{bbox};
+        relation{tag}{bbox};
         """
 
-    full_query = f"""
+    return f"""
     [out:json][timeout:25];
     (
       {query_parts}
     );
-    out center meta;
-    """
-
-    for url in OVERPASS_URLS:
-        try:
-            response = requests.post(url, data={"data": full_query}, timeout=30)
-            if response.status_code != 200:
-                continue
-
-            data = response.json()
-            elements = data.get("elements", [])
-
-            # Process and deduplicate places
-            unique_places = []
-            
-            for element in elements:
-                # Get coordinates - handle both node (direct lat/lon) and way/relation (center dict)
-                el_lat = element.get("lat")
-                el_lon = element.get("lon")
-                
-                # If not direct coordinates, try center dict
-                if el_lat is None or el_lon is None:
-                    center = element.get("center")
-                    if isinstance(center, dict):
-                        el_lat = center.get("lat")
-                        el_lon = center.get("lon")
-                
-                if el_lat is None or el_lon is None:
-                    continue
-
-                # Get name from tags
-                tags_data = element.get("tags", {})
-                name = tags_data.get("name") or tags_data.get("operator") or "Unnamed"
-                
-                # Calculate distance from center
-                distance = haversine_distance(lat, lon, el_lat, el_lon)
-
-                # Check if this point is too close to an existing unique place
-                is_duplicate = False
-                for existing_place in unique_places:
-                    if haversine_distance(el_lat, el_lon, existing_place["lat"], existing_place["lon"]) < 50:
-                        is_duplicate = True
-                        break
-                
-                if not is_duplicate:
-                    unique_places.append({
-                        "name": name,
-                        "lat": el_lat,
-                        "lon": el_lon,
-                        "distance": round(distance, 0),  # Distance in meters
-                        "type": place_type,
-                        "address": tags_data.get("addr:full") or tags_data.get("addr:street", "")
-                    })
-
-            # Sort by distance
-            unique_places.sort(key=lambda x: x["distance"])
-            return unique_places
-
-        except Exception as e:
-            print(f"Overpass Error for {place_type}: {e}")
+    out center tags;
+    """
+
+def build_places(elements, lat: float, lon: float, place_type: str):
+    """
+    Turns raw Overpass elements into a list of places sorted by distance.
+    Deduplicates results that are within 50 meters of each other.
+    """
+    located = []
+    for element in elements:
+        # Get coordinates - handle both node (direct lat/lon) and way/relation (center dict)
+        location = element_location(element)
+        if location is not None:
+            located.append((element, location))
+
+    if not located:
+        return []
+
+    lats = np.array([location[0] for _, location in located], dtype=float)
+    lons = np.array([location[1] for _, location in located], dtype=float)
+
+    # Calculate distance from center for every element at once
+    distances = np.round(haversine_distances(lat, lon, lats, lons), 0)
+    rows, cols = dedup_grid_cells(lats, lons)
+
+    # Accepted places per grid cell; only the 3x3 neighbourhood can be within 50m
+    grid = {}
+    unique_places = []
+
+    for (element, (el_lat, el_lon)), row, col, distance in zip(located, rows, cols, distances.tolist()):
+        # Check if this point is too close to an existing unique place
+        is_duplicate = any(
+            haversine_distance(el_lat, el_lon, existing["lat"], existing["lon"]) < DEDUP_DISTANCE
+            for d_row in (-1, 0, 1)
+            for d_col in (-1, 0, 1)
+            for existing in grid.get((row + d_row, col + d_col), ())
+        )
+        if is_duplicate:
             continue
 
-    return []
+        # Get name from tags
+        tags_data = element.get("tags", {})
+        name = tags_data.get("name") or tags_data.get("operator") or "Unnamed"
+
+        place = {
+            "name": name,
+            "lat": el_lat,
+            "lon": el_lon,
+            "distance": distance,  # Distance in meters
+            "type": place_type,
+            "address": tags_data.get("addr:full") or tags_data.get("addr:street", "")
+        }
+        unique_places.append(place)
+        grid.setdefault((row, col), []).append(place)
+
+    # Sort by distance (stable, so ties keep Overpass order)
+    order = np.argsort([place["distance"] for place in unique_places], kind="stable")
+    return [unique_places[i] for i in order]
+
+def places_from_features(tile_map, lat: float, lon: float, place_types, radius: int):
+    """
+    Answers a radius query from stored features.
+    An element can belong to several categories (e.g. an ATM is also listed under banks).
+    """
+    return {
+        place_type: build_places(
+            features_within(tile_map, lat, lon, radius, place_filters(place_type)), lat, lon, place_type
+        )
+        for place_type in place_types
+    }
+
+def split_place_types(place_types):
+    """(types the shared feature store answers, custom types that need their own query)."""
+    stored = [place_type for place_type in place_types if osm_features.covers(place_filters(place_type))]
+    return stored, [place_type for place_type in place_types if place_type not in stored]
+
+def get_nearby_places_multi(lat: float, lon: float, place_types, radius: int = 1500):
+    """
+    Gets nearby places for several categories.
+    Known categories come from the shared OSM feature store, which fetches each
+    tile once for every OSM-derived score; custom categories are queried directly.
+    Returns a dict mapping each place type to its list of places.
+    """
+    place_types = list(place_types)
+    tiles = tiles_covering(lat, lon, radius)
+    stored, custom = split_place_types(place_types)
+
+    tile_map = {}
+    if stored:
+        tile_map = osm_features.get_tiles(tiles)
+    if custom and tile_map is not None:
+        data = overpass.query(build_tiles_query(tiles, union_place_tags(custom)), timeout=30)
+        tile_map = None if data is None else {**tile_map, "custom": osm_features.build(data.get("elements", []))}
+
+    if tile_map is None:
+        print(f"Overpass Error for {', '.join(place_types)}: all mirrors failed")
+        return {place_type: [] for place_type in place_types}
+
+    return places_from_features(tile_map, lat, lon, place_types, radius)
+
+async def get_nearby_places_multi_async(lat: float, lon: float, place_types, radius: int = 1500, client=None):
+    """
+    Async variant of get_nearby_places_multi using the shared httpx.AsyncClient.
+    """
+    place_types = list(place_types)
+    tiles = tiles_covering(lat, lon, radius)
+    stored, custom = split_place_types(place_types)
+
+    tile_map = {}
+    if stored:
+        tile_map = await osm_features.get_tiles_async(tiles, client=client)
+    if custom and tile_map is not None:
+        data = await overpass.query_async(build_tiles_query(tiles, union_place_tags(custom)), timeout=30, client=client)
+        tile_map = None if data is None else {**tile_map, "custom": osm_features.build(data.get("elements", []))}
+
+    if tile_map is None:
+        print(f"Overpass Error for {', '.join(place_types)}: all mirrors failed")
+        return {place_type: [] for place_type in place_types}
+
+    return places_from_features(tile_map, lat, lon, place_types, radius)
+
+def get_nearby_places(lat: float, lon: float, place_type: str, radius: int = 1500):
+    """
+    Gets detailed information about nearby places within a radius.
+    Returns a list of places with name, coordinates, and distance.
+    Deduplicates results that are within 50 meters of each other.
+    """
+    return get_nearby_places_multi(lat, lon, [place_type], radius)[place_type]
 
 def count_nearby_places(lat: float, lon: float, place_type: str, radius: int = 1500):
     """
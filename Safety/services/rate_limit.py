@@ -0,0 +1,34 @@
+import asyncio
+import threading
+import time
+
+class RateLimiter:
+    """
+    Spaces out calls to an upstream so they never exceed a fixed rate.
+
+    Callers reserve the next free slot under a lock and then sleep until it,
+    so the same limiter works for worker threads and coroutines alike.
+    """
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Reserves the next slot and returns how long to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+            return slot - now
+
+    def wait(self):
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self):
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
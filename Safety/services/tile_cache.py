@@ -0,0 +1,150 @@
+import math
+
+import numpy as np
+
+# Grid cell size in degrees (~1.1 km north-south)
+TILE_DEG = 0.01
+
+# How long Overpass results for a tile stay valid
+TILE_TTL = 24 * 3600
+
+METERS_PER_DEGREE_LAT = 111195
+
+# Overpass returns nodes, then ways, then relations, each sorted by id
+ELEMENT_TYPE_ORDER = {"node": 0, "way": 1, "relation": 2}
+
+def tile_of(lat: float, lon: float):
+    return (math.floor(lat / TILE_DEG), math.floor(lon / TILE_DEG))
+
+def tile_bounds(tile):
+    """(south, west, north, east) of a tile."""
+    row, col = tile
+    return (row * TILE_DEG, col * TILE_DEG, (row + 1) * TILE_DEG, (col + 1) * TILE_DEG)
+
+def tiles_covering(lat: float, lon: float, radius: float):
+    """
+    All tiles touching the bounding box of a circle around (lat, lon).
+    """
+    dlat = radius / METERS_PER_DEGREE_LAT
+    dlon = radius / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 1e-6))
+
+    south, west = tile_of(lat - dlat, lon - dlon)
+    north, east = tile_of(lat + dlat, lon + dlon)
+
+    return [(row, col) for row in range(south, north + 1) for col in range(west, east + 1)]
+
+def tiles_bbox(tiles):
+    """(south, west, north, east) spanning all given tiles."""
+    bounds = [tile_bounds(tile) for tile in tiles]
+    return (
+        min(b[0] for b in bounds),
+        min(b[1] for b in bounds),
+        max(b[2] for b in bounds),
+        max(b[3] for b in bounds),
+    )
+
+def tile_rectangles(tiles):
+    """
+    Covers a set of tiles with few (min_row, min_col, max_row, max_col)
+    rectangles: runs of columns within each row, stacked where consecutive
+    rows have the same run.
+    """
+    runs = []
+    for row, col in sorted(set(tiles)):
+        if runs and runs[-1][0] == row and runs[-1][2] == col - 1:
+            runs[-1][2] = col
+        else:
+            runs.append([row, col, col])
+
+    open_rects = {}
+    rects = []
+    for row, first, last in runs:
+        rect = open_rects.pop((first, last, row - 1), None)
+        if rect is None:
+            rect = [row, first, row, last]
+            rects.append(rect)
+        rect[2] = row
+        open_rects[(first, last, row)] = rect
+    return [tuple(rect) for rect in rects]
+
+def element_location(element):
+    """
+    Coordinates of a node, or the center of a way/relation.
+    """
+    el_lat = element.get("lat")
+    el_lon = element.get("lon")
+
+    if el_lat is None or el_lon is None:
+        center = element.get("center")
+        if isinstance(center, dict):
+            el_lat = center.get("lat")
+            el_lon = center.get("lon")
+
+    if el_lat is None or el_lon is None:
+        return None
+    return el_lat, el_lon
+
+def line_geometry(parts):
+    """
+    Lines of (lat, lon) points (None for a missing point) as one (n, 2) array
+    with a NaN row between the parts; None if there are no points.
+    """
+    gap = (math.nan, math.nan)
+    points = []
+    for part in parts:
+        if not part:
+            continue
+        if points:
+            points.append(gap)
+        points.extend(gap if point is None else point for point in part)
+    return np.array(points, dtype=float) if points else None
+
+def element_geometry(element):
+    """
+    Points of a way or relation from an Overpass `out geom` response (relation
+    members as separate parts), as a line_geometry array. None for nodes and
+    elements without geometry.
+    """
+    if element.get("type") == "way":
+        parts = [element.get("geometry")]
+    elif element.get("type") == "relation":
+        parts = [
+            member.get("geometry") or ([member] if member.get("type") == "node" else None)
+            for member in element.get("members", ())
+        ]
+    else:
+        return None
+    return line_geometry(
+        [None if point is None else (point["lat"], point["lon"]) for point in part]
+        for part in parts if part
+    )
+
+def element_order(element):
+    return (ELEMENT_TYPE_ORDER.get(element.get("type"), 3), element.get("id", 0))
+
+def feature_from_element(element):
+    """
+    Compact feature for an Overpass element. Ways and relations are located at
+    the center of their bounding box (what Overpass `out center` reports) and keep
+    the box itself, and with `out geom` their points, for radius tests against
+    their extent.
+    """
+    bounds = element.get("bounds")
+    if isinstance(bounds, dict):
+        box = (bounds["minlat"], bounds["minlon"], bounds["maxlat"], bounds["maxlon"])
+        location = (round((box[0] + box[2]) / 2, 7), round((box[1] + box[3]) / 2, 7))
+    else:
+        box = None
+        location = element_location(element)
+        if location is None:
+            return None
+
+    return {
+        "type": element.get("type"),
+        "id": element.get("id"),
+        "lat": location[0],
+        "lon": location[1],
+        "bounds": box,
+        "geometry": element_geometry(element),
+        "tags": element.get("tags", {}),
+    }
@@ -1,14 +1,27 @@
-from fastapi import FastAPI, Response
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from pathlib import Path
 import sys
-from classification.land_classifier import classify_land
-from change_detection.change_detector import detect_change
 from suitability.scoring import calculate_suitability
 from satellite_data.pipeline import get_land_data
-
-app = FastAPI()
+from imaging.loader import image_cache, image_file_key
+from artifacts.store import ArtifactExpired, artifact_store, content_key
+from raster_analysis import (
+    RasterQueueFull,
+    analyze_rasters,
+    get_raster_executor,
+    raster_executor_stats,
+    render_overlay,
+    shutdown_raster_executor,
+    submit_raster_job,
+)
+from satellite_data.imagery_cache import imagery_cache
+from timeline import FIRST_YEAR, MAX_TIMELINE_YEARS, change_timeline
 
 BASE_DIR = Path(__file__).resolve().parents[1]
 SAFETY_DIR = BASE_DIR / "Safety"
@@ -17,6 +30,25 @@ for path in (BASE_DIR, SAFETY_DIR):
     if path_str not in sys.path:
         sys.path.append(path_str)
 
+from services.http_client import close_clients, open_clients
+
+# Seconds an overlay fetch waits for room in the raster queue before a 503
+OVERLAY_QUEUE_WAIT = 10
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pooled keep-alive HTTP clients shared by the Safety and surroundings services
+    open_clients()
+    # The raster pool is set up before the first request rather than inside one
+    get_raster_executor()
+    yield
+    await close_clients()
+    shutdown_raster_executor()
+
+
+app = FastAPI(lifespan=lifespan)
+
 from Safety.main import router as safety_router
 app.include_router(safety_router)
 
@@ -69,6 +101,23 @@ class PolygonRequest(BaseModel):
     coordinates: list   # list of lat/lng pairs
 
 
+class BatchPolygonRequest(BaseModel):
+    polygons: list[PolygonRequest]
+
+
+class TimelineRequest(BaseModel):
+    coordinates: list   # list of lat/lng pairs
+    start_year: int = 2020
+    end_year: int = 2024
+
+
+MAX_BATCH_POLYGONS = 10000
+# Concurrent Earth Engine lookups per batch
+LAND_DATA_CONCURRENCY = 8
+# Centroids closer than ~1 m share one imagery lookup
+CENTROID_DECIMALS = 5
+
+
 def _centroid(coords):
     if not coords:
         return None
@@ -88,22 +137,42 @@ def _centroid(coords):
     return (lat_sum / count, lon_sum / count)
 
 
-@app.post("/analyze")
-def analyze_land(request: PolygonRequest):
+def _render_overlay(old_path, new_path, file_keys):
+    # Decoding and encoding run in the raster pool; the fetching thread only waits
+    job = get_raster_executor().submit_blocking(
+        render_overlay, old_path, new_path, file_keys, timeout=OVERLAY_QUEUE_WAIT
+    )
+    body = job.result()
+    if body is None:
+        # A file changed since registration; its bytes must not be served under the old key
+        raise ArtifactExpired(f"{old_path} or {new_path} changed")
+    return body
 
-    # For now we are not cropping yet
-    # Just running on test.jpg
 
-    land = classify_land("test.jpg")
-    change = detect_change("old.jpg", "new.jpg")
-    suitability = calculate_suitability("test.jpg")
+def _register_overlay(old_path, new_path):
+    """
+    The overlay is decoded and encoded the first time its URL is fetched,
+    keyed by the input files (path, mtime, size) so registering it never
+    touches pixels on the request path and a changed file gets a new key.
+    If a file changes before the first fetch, the old URL becomes a 404.
+    Overlays live in this worker process only (see ArtifactStore).
+    """
+    file_keys = (image_file_key(old_path), image_file_key(new_path))
+    overlay_key = artifact_store.put_lazy(
+        content_key("change-overlay", old=file_keys[0], new=file_keys[1]),
+        lambda: _render_overlay(old_path, new_path, file_keys),
+        "image/jpeg",
+    )
+    return f"/artifacts/{overlay_key}"
+
 
+def _imagery(centroid):
     imagery = {
         "old_image_url": None,
         "new_image_url": None,
         "ndvi_url": None,
+        "ndvi_stats": None,
     }
-    centroid = _centroid(request.coordinates)
     if centroid:
         try:
             land_data = get_land_data(centroid[0], centroid[1])
@@ -111,14 +180,156 @@ def analyze_land(request: PolygonRequest):
                 "old_image_url": land_data.get("old_image"),
                 "new_image_url": land_data.get("new_image"),
                 "ndvi_url": land_data.get("ndvi"),
+                "ndvi_stats": land_data.get("ndvi_stats"),
             }
         except Exception:
             pass
+    return imagery
+
+
+@app.exception_handler(RasterQueueFull)
+async def raster_queue_full(request, exc):
+    # Heavy image work is shed here so the lightweight routes keep responding
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "5"})
+
+
+@app.post("/analyze")
+async def analyze_land(request: PolygonRequest):
+
+    # For now we are not cropping yet
+    # Just running on test.jpg
+
+    # OpenCV work runs in the raster process pool, imagery lookups on a thread,
+    # so neither ties up the event loop or the threadpool the other routes use
+    raster_inputs = ("test.jpg", "old.jpg", "new.jpg")
+    raster_job = submit_raster_job(analyze_rasters, *raster_inputs)
+    try:
+        imagery = await asyncio.to_thread(_imagery, _centroid(request.coordinates))
+        rasters = await raster_job
+    finally:
+        raster_job.cancel()
+
+    change = dict(rasters["change_detection"])
+    change["overlay_url"] = _register_overlay(raster_inputs[1], raster_inputs[2])
+
+    # Real NDVI for the parcel when Earth Engine returned it, the RGB proxy otherwise
+    suitability = rasters["suitability"]
+    if imagery["ndvi_stats"] is not None:
+        suitability = calculate_suitability(None, ndvi=imagery["ndvi_stats"])
 
     return {
-        "land_classification": land,
+        "land_classification": rasters["land_classification"],
         "change_detection": change,
         "suitability": suitability,
         "polygon_received": request.coordinates,
         **imagery,
     }
+
+
+@app.post("/analyze/batch")
+async def analyze_land_batch(request: BatchPolygonRequest):
+    """
+    Analyzes many polygons in one call and streams one NDJSON line per polygon
+    as soon as it is done (in completion order, tagged with its index).
+    Polygons sharing a centroid share one imagery lookup, and the raster
+    analysis runs once per distinct input set in a worker process.
+    """
+    polygons = request.polygons
+    if len(polygons) > MAX_BATCH_POLYGONS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_POLYGONS} polygons per batch")
+
+    # Every parcel currently runs on the same sample rasters, so this is one job
+    raster_inputs = ("test.jpg", "old.jpg", "new.jpg")
+    raster_job = submit_raster_job(analyze_rasters, *raster_inputs)
+    overlay_url = _register_overlay(raster_inputs[1], raster_inputs[2])
+
+    limiter = asyncio.Semaphore(LAND_DATA_CONCURRENCY)
+    imagery_jobs = {}
+
+    async def imagery_for(key):
+        async with limiter:
+            return await asyncio.to_thread(_imagery, key)
+
+    async def analyze_one(index, polygon):
+        centroid = _centroid(polygon.coordinates)
+        key = None if centroid is None else tuple(round(value, CENTROID_DECIMALS) for value in centroid)
+        if key not in imagery_jobs:
+            imagery_jobs[key] = asyncio.ensure_future(imagery_for(key))
+
+        try:
+            rasters = await asyncio.shield(raster_job)
+        except Exception as e:
+            return {"index": index, "error": f"Raster analysis failed: {e}", "polygon_received": polygon.coordinates}
+
+        change = dict(rasters["change_detection"], overlay_url=overlay_url)
+        imagery = await asyncio.shield(imagery_jobs[key])
+
+        suitability = rasters["suitability"]
+        if imagery["ndvi_stats"] is not None:
+            suitability = calculate_suitability(None, ndvi=imagery["ndvi_stats"])
+
+        return {
+            "index": index,
+            "land_classification": rasters["land_classification"],
+            "change_detection": change,
+            "suitability": suitability,
+            "polygon_received": polygon.coordinates,
+            **imagery,
+        }
+
+    async def stream():
+        tasks = [asyncio.ensure_future(analyze_one(i, polygon)) for i, polygon in enumerate(polygons)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield json.dumps(await finished) + "\n"
+        finally:
+            # A client that disconnects must not leave queued imagery lookups behind
+            for task in tasks:
+                task.cancel()
+            for job in imagery_jobs.values():
+                job.cancel()
+            raster_job.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@app.post("/analyze/timeline")
+async def analyze_timeline(request: TimelineRequest):
+    """
+    Year-over-year change for a parcel: one entry per pair of consecutive
+    years in the range, reusing every pair computed by earlier requests.
+    """
+    centroid = _centroid(request.coordinates)
+    if centroid is None:
+        raise HTTPException(status_code=422, detail="Polygon has no valid coordinates")
+
+    start_year, end_year = request.start_year, request.end_year
+    if start_year < FIRST_YEAR or end_year <= start_year:
+        raise HTTPException(status_code=422, detail=f"Need {FIRST_YEAR} <= start_year < end_year")
+    if end_year - start_year + 1 > MAX_TIMELINE_YEARS:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_TIMELINE_YEARS} years per timeline")
+
+    timeline = await asyncio.to_thread(change_timeline, centroid[0], centroid[1], start_year, end_year)
+    timeline["polygon_received"] = request.coordinates
+    return timeline
+
+
+@app.get("/analyze/stats")
+def analyze_stats():
+    return {
+        "raster_executor": raster_executor_stats(),
+        "decoded_images": image_cache.stats(),
+        "imagery_cache": imagery_cache.stats(),
+        "artifacts": artifact_store.stats(),
+    }
+
+
+@app.get("/artifacts/{key}")
+def get_artifact(key: str):
+    artifact = artifact_store.get(key)
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="Artifact not found or expired")
+
+    body, media_type = artifact
+    # Content-addressed, so the bytes behind a key never change
+    return Response(content=body, media_type=media_type, headers={"Cache-Control": "public, max-age=86400, immutable"})
@@ -0,0 +1 @@
+# In-memory store for rendered request artifacts (change overlays)
@@ -0,0 +1,109 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Bounds for what the store keeps in memory
+MAX_ARTIFACTS = 256
+MAX_RENDERED_BYTES = 64 * 1024 * 1024
+
+def content_key(kind, *arrays, **params):
+    """
+    Content address for an artifact derived from its inputs, so identical
+    requests share one artifact and different requests never collide.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(kind.encode("utf-8"))
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(str((array.shape, array.dtype.str)).encode("utf-8"))
+        digest.update(memoryview(array).cast("B"))
+    digest.update(repr(sorted(params.items())).encode("utf-8"))
+    return digest.hexdigest()
+
+class ArtifactExpired(Exception):
+    """Raised by a render function whose inputs changed after registration; the artifact is dropped."""
+
+class _Artifact:
+    def __init__(self, render, media_type):
+        self.render = render
+        self.media_type = media_type
+        self.body = None
+        self.lock = threading.Lock()
+
+class ArtifactStore:
+    """
+    In-memory, content-addressed artifact store. Artifacts are registered with
+    a render function and only rendered (e.g. JPEG-encoded) the first time
+    someone fetches them, off the request that produced them.
+
+    The store lives in one process. With several server workers
+    (`uvicorn --workers N`) an artifact URL only resolves on the worker that
+    registered it; elsewhere it is a 404. Run one worker, or use sticky
+    sessions, until artifacts move to shared storage.
+    """
+
+    def __init__(self, max_artifacts: int = MAX_ARTIFACTS, max_rendered_bytes: int = MAX_RENDERED_BYTES):
+        self.max_artifacts = max_artifacts
+        self.max_rendered_bytes = max_rendered_bytes
+        self._artifacts = OrderedDict()
+        self._rendered_bytes = 0
+        self._lock = threading.Lock()
+
+    def put_lazy(self, key, render, media_type):
+        with self._lock:
+            if key in self._artifacts:
+                self._artifacts.move_to_end(key)
+            else:
+                self._artifacts[key] = _Artifact(render, media_type)
+                self._evict()
+        return key
+
+    def get(self, key):
+        """(body, media_type) for a stored artifact, or None if unknown or evicted."""
+        with self._lock:
+            artifact = self._artifacts.get(key)
+            if artifact is None:
+                return None
+            self._artifacts.move_to_end(key)
+
+        with artifact.lock:
+            if artifact.body is None:
+                try:
+                    artifact.body = artifact.render()
+                except ArtifactExpired:
+                    with self._lock:
+                        if self._artifacts.get(key) is artifact:
+                            del self._artifacts[key]
+                    return None
+                artifact.render = None
+                with self._lock:
+                    if self._artifacts.get(key) is artifact:
+                        self._rendered_bytes += len(artifact.body)
+                        self._evict(keep=key)
+        return artifact.body, artifact.media_type
+
+    def _evict(self, keep=None):
+        # Caller holds self._lock
+        while self._artifacts and (
+            len(self._artifacts) > self.max_artifacts or self._rendered_bytes > self.max_rendered_bytes
+        ):
+            oldest = next(iter(self._artifacts))
+            if oldest == keep:
+                if len(self._artifacts) == 1:
+                    break
+                self._artifacts.move_to_end(oldest)
+                continue
+            artifact = self._artifacts.pop(oldest)
+            if artifact.body is not None:
+                self._rendered_bytes -= len(artifact.body)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "artifacts": len(self._artifacts),
+                "rendered_bytes": self._rendered_bytes,
+            }
+
+artifact_store = ArtifactStore()
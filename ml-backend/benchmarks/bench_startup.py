@@ -0,0 +1,61 @@
+"""
+Benchmark: API import time and Earth Engine initialization with `ee` stubbed out.
+ee.Initialize is replaced by a sleep standing in for the OAuth/project round-trip,
+so this runs offline. Run from the ml-backend folder:  python benchmarks/bench_startup.py
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# Simulated cost of one ee.Initialize call (credential refresh + project lookup)
+INIT_SECONDS = 1.5
+CONCURRENT_REQUESTS = 8
+
+def install_fake_ee():
+    calls = []
+
+    def initialize(**kwargs):
+        calls.append(kwargs)
+        time.sleep(INIT_SECONDS)
+
+    fake = mock.MagicMock(name="ee")
+    fake.Initialize = initialize
+    sys.modules["ee"] = fake
+    return calls
+
+def main():
+    init_calls = install_fake_ee()
+
+    start = time.perf_counter()
+    import api  # noqa: F401  (imports the whole satellite_data package)
+    import_seconds = time.perf_counter() - start
+    print(f"import api:                 {import_seconds * 1000:8.1f} ms, ee.Initialize calls: {len(init_calls)}")
+
+    from satellite_data.pipeline import get_land_data
+
+    barrier = threading.Barrier(CONCURRENT_REQUESTS)
+
+    def request():
+        barrier.wait()
+        get_land_data(12.9692, 79.1333)
+
+    threads = [threading.Thread(target=request) for _ in range(CONCURRENT_REQUESTS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    first_seconds = time.perf_counter() - start
+    print(f"{CONCURRENT_REQUESTS} concurrent first requests: {first_seconds * 1000:8.1f} ms, ee.Initialize calls: {len(init_calls)}")
+
+    start = time.perf_counter()
+    get_land_data(12.9692, 79.1333)
+    warm_seconds = time.perf_counter() - start
+    print(f"warm request:               {warm_seconds * 1000:8.1f} ms, ee.Initialize calls: {len(init_calls)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark: surroundings zone scoring with the precompiled tag classifier, checked
+against the previous per-element keyword scan. Runs offline on a synthetic
+Overpass response shaped like a dense 300 m city circle.
+Run from the ml-backend folder:  python benchmarks/bench_surroundings.py
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT.parent / "Safety"))
+
+from surroundings.service import score_surroundings
+
+ROUNDS = 200
+
+# Values roughly as frequent as in Indian metro extracts, plus free-text and mixed-case ones
+BUILDINGS = [
+    "yes", "yes", "yes", "yes", "yes", "house", "apartments", "residential", "commercial", "retail",
+    "industrial", "warehouse", "school", "hospital", "temple", "garage", "garages", "roof", "shed",
+    "semidetached_house", "detached", "construction", "university", "Residential", "hut", "kiosk",
+]
+LAND = [
+    "residential", "commercial", "retail", "industrial", "grass", "park", "wood", "water", "scrub",
+    "farmland", "meadow", "religious", "education", "construction", "brownfield", "cemetery",
+    "railway", "garages", "village_green", "recreation_ground", "military", "Orchard",
+]
+HIGHWAYS = ["residential", "service", "footway", "primary", "secondary", "tertiary", "path", "track", "unclassified"]
+
+def make_response(size: int = 6000, seed: int = 23):
+    rng = random.Random(seed)
+    elements = []
+    for i in range(size):
+        roll = rng.random()
+        if roll < 0.75:
+            tags = {"building": rng.choice(BUILDINGS)}
+        elif roll < 0.9:
+            tags = {"highway": rng.choice(HIGHWAYS)}
+        else:
+            tags = {rng.choice(["landuse", "landuse", "natural"]): rng.choice(LAND)}
+        elements.append({"type": "way", "id": i, "tags": tags})
+    return elements
+
+def reference_score(elements, radius: int):
+    """The scoring loop before the classifier was precompiled."""
+    categories = {
+        "Agriculture": ["farmland", "farmyard", "orchard", "vineyard", "meadow", "greenhouse"],
+        "Residential": ["residential", "apartments", "house", "detached"],
+        "Commercial & Retail": ["commercial", "retail", "supermarket", "mall"],
+        "Industrial": ["industrial", "warehouse", "manufacturing", "brownfield", "construction"],
+        "Nature & Parks": ["forest", "wood", "nature_reserve", "park", "water", "grass", "scrub"],
+        "Institutional": ["institutional", "education", "school", "hospital", "religious", "university"]
+    }
+    scores = {key: 0.0 for key in categories.keys()}
+    scores["Mixed / Other"] = 0.0
+    total_points = 0.0
+    road_count = 0
+
+    for el in elements:
+        tags = el.get("tags", {})
+        if "highway" in tags:
+            if tags["highway"] not in ["track", "path", "footway"]:
+                road_count += 1
+            continue
+        land_type = tags.get("landuse") or tags.get("natural")
+        building_type = tags.get("building")
+        feature_weight = 0.0
+        primary_tag = ""
+        if land_type:
+            feature_weight = 10.0
+            primary_tag = land_type.lower()
+        elif building_type:
+            feature_weight = 1.0
+            primary_tag = building_type.lower() if building_type != "yes" else "residential"
+        if not primary_tag or feature_weight == 0:
+            continue
+        total_points += feature_weight
+        matched = False
+        for category, keywords in categories.items():
+            if any(kw in primary_tag for kw in keywords):
+                scores[category] += feature_weight
+                matched = True
+                break
+        if not matched:
+            scores["Mixed / Other"] += feature_weight
+
+    return {category: round(score / total_points * 100, 1) for category, score in scores.items()}, road_count
+
+def timed(fn, elements):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        fn(elements, 300)
+    return (time.perf_counter() - start) / ROUNDS * 1000
+
+if __name__ == "__main__":
+    elements = make_response()
+    result = score_surroundings(elements, 300)
+    percentages, road_count = reference_score(elements, 300)
+
+    identical = result["area_profile_percentages"] == percentages and result["diagnostics"]["paved_roads_found"] == road_count
+    print(f"elements:              {len(elements)}")
+    print(f"percentages identical: {identical}")
+    print(f"keyword scan:          {timed(reference_score, elements):8.2f} ms per circle")
+    print(f"precompiled:           {timed(score_surroundings, elements):8.2f} ms per circle")
@@ -0,0 +1,130 @@
+"""
+Benchmark: area-weighted surroundings scoring (shoelace cut to the radius circle)
+on a synthetic Overpass `out geom` response for a dense 300 m city circle.
+A cold circle parses the response body and packs it for the cache; a cached
+circle only scores. The request budget is 50 ms of CPU per circle: a cached
+circle is well within it, but a cold one is not, since parsing the ~2 MB body
+alone takes most of it. That cost comes once per fetch, next to an Overpass
+round trip of seconds. Runs offline.
+Run from the ml-backend folder:  python benchmarks/bench_surroundings_area.py
+"""
+import json
+import math
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT.parent / "Safety"))
+
+from services.overpass_client import STREAM_CHUNK_SIZE, ElementStream
+from surroundings.geometry import METERS_PER_DEGREE_LAT, clipped_areas, element_rings, table_bytes
+from surroundings.service import area_inputs, score_area_inputs
+
+CENTER = (19.07, 72.88)
+RADIUS = 300
+ROUNDS = 50
+BUDGET_MS = 50
+
+BUILDINGS = ["yes", "yes", "yes", "house", "apartments", "commercial", "retail", "industrial", "school", "garage"]
+LAND = ["residential", "commercial", "industrial", "grass", "park", "wood", "water", "religious", "construction"]
+
+def to_geometry(points):
+    """Local meters -> Overpass geometry around CENTER."""
+    scale = METERS_PER_DEGREE_LAT * math.cos(math.radians(CENTER[0]))
+    return [{"lat": CENTER[0] + y / METERS_PER_DEGREE_LAT, "lon": CENTER[1] + x / scale} for x, y in points]
+
+def blob(rng, cx, cy, size, vertices):
+    """Irregular star-shaped polygon, closed."""
+    points = []
+    for i in range(vertices):
+        angle = 2 * math.pi * i / vertices
+        r = size * rng.uniform(0.6, 1.0)
+        points.append((cx + r * math.cos(angle), cy + r * math.sin(angle)))
+    return points + points[:1]
+
+def footprint(rng, cx, cy):
+    w, h, turn = rng.uniform(6, 20), rng.uniform(6, 25), rng.uniform(0, math.pi)
+    corners = [(-w, -h), (w, -h), (w, h), (-w, h)]
+    if rng.random() < 0.3:
+        corners = [(-w, -h), (w, -h), (w, 0), (0, 0), (0, h), (-w, h)]
+    points = [
+        (cx + x * math.cos(turn) - y * math.sin(turn), cy + x * math.sin(turn) + y * math.cos(turn))
+        for x, y in corners
+    ]
+    return points + points[:1]
+
+def make_response(buildings: int = 2500, land: int = 40, relations: int = 5, roads: int = 300, seed: int = 24):
+    rng = random.Random(seed)
+    extent = RADIUS + 100
+    elements = []
+    for i in range(buildings):
+        points = footprint(rng, rng.uniform(-extent, extent), rng.uniform(-extent, extent))
+        elements.append({"type": "way", "id": i, "tags": {"building": rng.choice(BUILDINGS)}, "geometry": to_geometry(points)})
+    for i in range(land):
+        points = blob(rng, rng.uniform(-extent, extent), rng.uniform(-extent, extent), rng.uniform(40, 250), rng.randint(50, 300))
+        key = "natural" if rng.random() < 0.3 else "landuse"
+        elements.append({"type": "way", "id": buildings + i, "tags": {key: rng.choice(LAND)}, "geometry": to_geometry(points)})
+    for i in range(relations):
+        cx, cy, size = rng.uniform(-extent, extent), rng.uniform(-extent, extent), rng.uniform(150, 400)
+        outer = blob(rng, cx, cy, size, 400)
+        hole = blob(rng, cx, cy, size / 4, 60)
+        # The outer ring is split into several member ways, as in real multipolygons
+        cuts = sorted(rng.sample(range(1, 400), 3))
+        pieces = [outer[a:b + 1] for a, b in zip([0] + cuts, cuts + [400])]
+        members = [{"type": "way", "role": "outer", "geometry": to_geometry(piece)} for piece in pieces]
+        members.append({"type": "way", "role": "inner", "geometry": to_geometry(hole)})
+        elements.append({"type": "relation", "id": 10 ** 6 + i, "tags": {"landuse": rng.choice(LAND), "type": "multipolygon"}, "members": members})
+    for i in range(roads):
+        elements.append({"type": "way", "id": 2 * 10 ** 6 + i, "tags": {"highway": rng.choice(["residential", "service", "footway"])}})
+    return elements
+
+def overpass_body(elements):
+    """Serialized the way Overpass does: every element starts on a new line."""
+    header = '{\n  "version": 0.6,\n  "generator": "Overpass API",\n  "elements": [\n\n'
+    return (header + ",\n".join(json.dumps(element, indent=2) for element in elements) + "\n\n  ]\n}\n").encode()
+
+def parse(body):
+    """What the Overpass client does with a response body."""
+    stream = ElementStream()
+    for start in range(0, len(body), STREAM_CHUNK_SIZE):
+        stream.feed(body[start:start + STREAM_CHUNK_SIZE])
+    return stream.close()["elements"]
+
+def cpu_ms(fn, rounds: int = ROUNDS):
+    times = []
+    for _ in range(rounds):
+        start = time.process_time()
+        result = fn()
+        times.append((time.process_time() - start) * 1000)
+    return statistics.median(times), max(times), result
+
+def check_accuracy():
+    """A polygon covering the whole circle must come out at the area of the circle."""
+    square = to_geometry([(-1000, -1000), (1000, -1000), (1000, 1000), (-1000, 1000), (-1000, -1000)])
+    area = clipped_areas([element_rings({"type": "way", "geometry": square})], *CENTER, RADIUS)[0]
+    return area / (math.pi * RADIUS ** 2)
+
+if __name__ == "__main__":
+    body = overpass_body(make_response())
+    inputs = area_inputs(parse(body))
+
+    parse_median, parse_max, _ = cpu_ms(lambda: parse(body))
+    cold_median, cold_max, _ = cpu_ms(lambda: score_area_inputs(area_inputs(parse(body)), *CENTER, RADIUS))
+    warm_median, warm_max, result = cpu_ms(lambda: score_area_inputs(inputs, *CENTER, RADIUS))
+
+    print(f"elements:               {len(inputs['tags'])} ({len(body) / 1e6:.1f} MB body, "
+          f"{table_bytes(inputs['rings']) / 1e6:.2f} MB of cached vertices)")
+    print(f"covering square / circle area: {check_accuracy():.4f}")
+    print(f"dominant zone:          {result['dominant_zone']} {result['area_profile_percentages']}")
+    rows = (
+        ("parse only", parse_median, parse_max),
+        ("cold (parse + score)", cold_median, cold_max),
+        ("cached (score)", warm_median, warm_max),
+    )
+    for label, median, worst in rows:
+        print(f"{label:22s}  {median:8.2f} ms median, {worst:8.2f} ms max "
+              f"({'within' if median < BUDGET_MS else 'OVER'} the {BUDGET_MS} ms budget)")
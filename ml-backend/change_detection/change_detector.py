@@ -1,30 +1,134 @@
+import os
+
 import cv2
 import numpy as np
 
-def detect_change(old_image_path, new_image_path):
-    img1 = cv2.imread(old_image_path)
-    img2 = cv2.imread(new_image_path)
+from imaging.loader import load_image
+
+# Pixels whose grey-level difference exceeds this count as changed
+CHANGE_THRESHOLD = 30
+# Percentage of changed pixels that raises an encroachment alert
+ALERT_PERCENT = 5
+DEFAULT_TILE_SIZE = 512
+
+def open_raster(source):
+    """
+    Opens a raster for windowed reads without copying it.
+    Arrays (including np.memmap) are used as is and .npy files are memory-mapped;
+    compressed formats such as JPEG are decoded once through load_image.
+    """
+    if isinstance(source, np.ndarray):
+        return source
+    # Encoded bytes go straight to load_image; only paths can name a .npy file
+    if isinstance(source, (str, os.PathLike)) and os.fspath(source).lower().endswith(".npy"):
+        return np.load(source, mmap_mode="r")
+    return load_image(source)
+
+def iter_windows(height, width, tile_size):
+    """Yields (row, col, y0, y1, x0, x1) for every tile of the grid."""
+    for row, y0 in enumerate(range(0, height, tile_size)):
+        for col, x0 in enumerate(range(0, width, tile_size)):
+            yield row, col, y0, min(y0 + tile_size, height), x0, min(x0 + tile_size, width)
 
-    diff = cv2.absdiff(img1, img2)
+def change_mask(old_tile, new_tile, threshold=CHANGE_THRESHOLD):
+    diff = cv2.absdiff(np.ascontiguousarray(old_tile), np.ascontiguousarray(new_tile))
     gray = cv2.cvtColor(diff, cv2.COLOR_BGR2GRAY)
+    _, thresh = cv2.threshold(gray, threshold, 255, cv2.THRESH_BINARY)
+    return thresh > 0
 
-    _, thresh = cv2.threshold(gray, 30, 255, cv2.THRESH_BINARY)
+def _open_pair(old_image, new_image):
+    img1 = open_raster(old_image)
+    img2 = open_raster(new_image)
+    if img1.shape != img2.shape:
+        raise ValueError(f"Images differ in shape: {img1.shape} vs {img2.shape}")
+    return img1, img2
 
-    changed_pixels = np.sum(thresh > 0)
-    total_pixels = thresh.size
-    percent_change = (changed_pixels / total_pixels) * 100
+def detect_change_tiled(old_image, new_image, tile_size=DEFAULT_TILE_SIZE, threshold=CHANGE_THRESHOLD):
+    """
+    Change detection that streams matching windows of both rasters, so peak
+    memory is bounded by the tile size rather than the image size.
 
-    # Create red overlay for changes
-    overlay = img2.copy()
-    overlay[thresh > 0] = [0, 0, 255]  # Red color
+    Returns the overall change, the per-tile change map (percent changed per
+    tile, row-major) and the tiles above the alert level as hotspots.
+    """
+    img1, img2 = _open_pair(old_image, new_image)
+    height, width = img1.shape[:2]
 
-    cv2.imwrite("change_output.jpg", overlay)
+    rows = -(-height // tile_size)
+    cols = -(-width // tile_size)
+    tile_map = np.zeros((rows, cols), dtype=np.float64)
+    changed_pixels = 0
+
+    for row, col, y0, y1, x0, x1 in iter_windows(height, width, tile_size):
+        changed = int(np.count_nonzero(change_mask(img1[y0:y1, x0:x1], img2[y0:y1, x0:x1], threshold)))
+        changed_pixels += changed
+        tile_map[row, col] = changed / ((y1 - y0) * (x1 - x0)) * 100
+
+    percent_change = (changed_pixels / (height * width)) * 100
+
+    hotspots = [
+        {
+            "row": int(row),
+            "col": int(col),
+            "x": int(col * tile_size),
+            "y": int(row * tile_size),
+            "width": int(min(tile_size, width - col * tile_size)),
+            "height": int(min(tile_size, height - row * tile_size)),
+            "percent_change": float(round(tile_map[row, col], 2)),
+        }
+        for row, col in zip(*np.nonzero(tile_map > ALERT_PERCENT))
+    ]
+    hotspots.sort(key=lambda h: h["percent_change"], reverse=True)
 
     alert = "No Significant Change"
-    if percent_change > 5:
+    if percent_change > ALERT_PERCENT:
         alert = "Encroachment Alert!"
 
     return {
-        "percent_change": float(round(percent_change, 2)),  
-        "status": alert
+        "percent_change": float(round(percent_change, 2)),
+        "status": alert,
+        "tile_size": tile_size,
+        "tile_map": np.round(tile_map, 2).tolist(),
+        "hotspots": hotspots,
+    }
+
+def change_overlay(old_image, new_image, out=None, tile_size=DEFAULT_TILE_SIZE, threshold=CHANGE_THRESHOLD):
+    """
+    Copy of the new image with changed pixels painted red, built tile by tile.
+    Only call this when the overlay is actually needed; pass a writable
+    np.memmap as `out` to keep large overlays off the heap.
+    """
+    img1, img2 = _open_pair(old_image, new_image)
+    height, width = img1.shape[:2]
+    if out is None:
+        out = np.empty_like(img2)
+
+    for _, _, y0, y1, x0, x1 in iter_windows(height, width, tile_size):
+        window = out[y0:y1, x0:x1]
+        window[...] = img2[y0:y1, x0:x1]
+        window[change_mask(img1[y0:y1, x0:x1], img2[y0:y1, x0:x1], threshold)] = [0, 0, 255]  # Red color
+
+    return out
+
+def render_change_overlay_jpeg(old_image, new_image, quality=90):
+    """
+    JPEG bytes of the change overlay, encoded in memory.
+    """
+    ok, encoded = cv2.imencode(".jpg", change_overlay(old_image, new_image), [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("Could not encode change overlay")
+    return encoded.tobytes()
+
+def detect_change(old_image, new_image):
+    """
+    Pixel difference between two co-registered images.
+    Each image is a path or an already decoded BGR array.
+    Nothing is written to disk; use change_overlay / render_change_overlay_jpeg
+    when the overlay itself is needed.
+    """
+    result = detect_change_tiled(old_image, new_image)
+
+    return {
+        "percent_change": result["percent_change"],
+        "status": result["status"]
     }
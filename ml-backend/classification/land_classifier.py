@@ -1,14 +1,16 @@
-import cv2
-import numpy as np
+from imaging.stats import raster_stats
 
-def classify_land(image_path):
-    img = cv2.imread(image_path)
+def classify_land(image, stats=None):
+    """
+    Rule-based land type from the average colour.
+    `image` is a path or an already decoded BGR array; pass precomputed
+    `raster_stats` to avoid another pass over the pixels.
+    """
+    if stats is None:
+        stats = raster_stats(image)
 
-    # Convert to RGB
-    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-
-    # Calculate average color
-    avg_color = np.mean(img, axis=(0, 1))
+    # Average colour
+    avg_color = stats["mean_rgb"]
     r, g, b = avg_color
 
     # Simple rule-based classification
@@ -22,6 +24,6 @@ def classify_land(image_path):
         land_type = "Barren Land"
 
     return {
-        "average_rgb": avg_color.tolist(),
+        "average_rgb": avg_color,
         "land_type": land_type
     }
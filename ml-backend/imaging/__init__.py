@@ -0,0 +1 @@
+# Image loading helpers shared by the raster analyzers
@@ -0,0 +1,81 @@
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+# How many decoded images to keep in memory
+IMAGE_CACHE_SIZE = 32
+
+def image_file_key(path):
+    """Identity of an image file on disk: absolute path, modification time and size."""
+    path = os.path.abspath(os.fspath(path))
+    stat = os.stat(path)
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+class DecodedImageCache:
+    """
+    LRU cache of decoded images keyed by path, modification time and size,
+    so an image is decoded again only when the file on disk changes.
+    """
+
+    def __init__(self, maxsize: int = IMAGE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, path):
+        key = image_file_key(path)
+        path = key[0]
+
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+                self.hits += 1
+                return image
+            self.misses += 1
+
+        image = cv2.imread(path)
+        if image is None:
+            raise ValueError(f"Could not decode image: {path}")
+        # Shared between requests, so nobody may modify it in place
+        image.flags.writeable = False
+
+        with self._lock:
+            # Drop older versions of the same file before caching the new one
+            for stale in [k for k in self._images if k[0] == path]:
+                del self._images[stale]
+            self._images[key] = image
+            while len(self._images) > self.maxsize:
+                self._images.popitem(last=False)
+        return image
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._images),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+image_cache = DecodedImageCache()
+
+def load_image(image):
+    """
+    Returns a decoded BGR image. Accepts an already decoded array (returned
+    as is), encoded image bytes (e.g. a downloaded thumbnail) or a path,
+    which is decoded at most once while the file is unchanged.
+    """
+    if isinstance(image, np.ndarray):
+        return image
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        decoded = cv2.imdecode(np.frombuffer(image, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if decoded is None:
+            raise ValueError("Could not decode image bytes")
+        return decoded
+    return image_cache.load(image)
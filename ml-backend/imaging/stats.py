@@ -0,0 +1,50 @@
+import numpy as np
+
+from imaging.loader import load_image
+
+# Rows processed per chunk; bounds the float32 scratch buffers to a few MB
+STATS_CHUNK_ROWS = 256
+
+def raster_stats(image, chunk_rows: int = STATS_CHUNK_ROWS):
+    """
+    Per-image statistics used by the land classifier and suitability scoring,
+    computed in one pass over the BGR image without converting or copying it whole.
+
+    Returns mean RGB, the green / (red + blue) vegetation index and the pixel count.
+    """
+    img = load_image(image)
+    height, width = img.shape[:2]
+    pixel_count = height * width
+    if pixel_count == 0:
+        raise ValueError("Empty image")
+
+    channel_sums = np.zeros(3, dtype=np.int64)  # B, G, R
+    vegetation_sum = 0.0
+
+    # Scratch buffers reused for every chunk
+    rows = min(chunk_rows, height)
+    green = np.empty((rows, width), dtype=np.float32)
+    denominator = np.empty((rows, width), dtype=np.float32)
+
+    for start in range(0, height, chunk_rows):
+        chunk = img[start:start + chunk_rows]
+        n = chunk.shape[0]
+
+        channel_sums += chunk.reshape(-1, 3).sum(axis=0, dtype=np.int64)
+
+        # g / (r + b + 1e-5), the NDVI-like index used when there is no NIR band
+        g = green[:n]
+        d = denominator[:n]
+        np.add(chunk[:, :, 2], chunk[:, :, 0], out=d, dtype=np.float32)
+        d += 1e-5
+        np.copyto(g, chunk[:, :, 1], casting="unsafe")
+        np.divide(g, d, out=g)
+        vegetation_sum += float(g.sum(dtype=np.float64))
+
+    b, g, r = (channel_sums / pixel_count).tolist()
+
+    return {
+        "mean_rgb": [r, g, b],
+        "vegetation_index": vegetation_sum / pixel_count,
+        "pixel_count": pixel_count,
+    }
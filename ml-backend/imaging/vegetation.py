@@ -0,0 +1,59 @@
+import io
+
+import numpy as np
+
+# Pixels above this NDVI count as vegetated
+VEGETATION_NDVI = 0.3
+
+def load_bands(source):
+    """
+    Red/NIR reflectance raster of shape (height, width, 2), band order B4, B8.
+    Accepts an array, a path to a .npy file (memory-mapped) or .npy bytes.
+    """
+    if isinstance(source, np.ndarray):
+        bands = source
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        bands = np.load(io.BytesIO(source), allow_pickle=False)
+    else:
+        bands = np.load(source, mmap_mode="r", allow_pickle=False)
+
+    if bands.ndim != 3 or bands.shape[2] != 2:
+        raise ValueError(f"Expected a (height, width, 2) red/NIR raster, got shape {bands.shape}")
+    return bands
+
+def ndvi_from_bands(bands):
+    """
+    (NIR - red) / (NIR + red) per pixel as float32. Pixels with no
+    reflectance in either band (outside the scene or masked) are NaN.
+    """
+    bands = load_bands(bands)
+    red = bands[:, :, 0].astype(np.float32)
+    nir = bands[:, :, 1].astype(np.float32)
+
+    total = nir + red
+    ndvi = np.full(total.shape, np.nan, dtype=np.float32)
+    np.divide(nir - red, total, out=ndvi, where=total > 0)
+    return ndvi
+
+def ndvi_stats(bands):
+    """
+    Summary of the NDVI over a red/NIR raster, used by suitability scoring
+    in place of the RGB vegetation proxy.
+    """
+    ndvi = ndvi_from_bands(bands)
+    valid = ndvi[np.isfinite(ndvi)]
+    if valid.size == 0:
+        raise ValueError("No valid NDVI pixels")
+
+    p10, median, p90 = np.percentile(valid, [10, 50, 90]).tolist()
+
+    return {
+        "mean": round(float(valid.mean(dtype=np.float64)), 4),
+        "median": round(median, 4),
+        "std": round(float(valid.std(dtype=np.float64)), 4),
+        "p10": round(p10, 4),
+        "p90": round(p90, 4),
+        "vegetated_fraction": round(float(np.count_nonzero(valid > VEGETATION_NDVI)) / valid.size, 4),
+        "valid_pixels": int(valid.size),
+        "pixel_count": int(ndvi.size),
+    }
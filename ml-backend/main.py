@@ -1,5 +1,8 @@
 from classification.land_classifier import classify_land
-from change_detection.change_detector import detect_change
+import cv2
+
+from change_detection.change_detector import change_overlay, detect_change
+from imaging.vegetation import ndvi_stats
 from suitability.scoring import calculate_suitability
 
 print("----- LAND CLASSIFICATION -----")
@@ -9,8 +12,14 @@ print(result)
 print("\n----- CHANGE DETECTION -----")
 change = detect_change("old.jpg", "new.jpg")
 print(change)
+cv2.imwrite("change_output.jpg", change_overlay("old.jpg", "new.jpg"))
 
 print("\n----- SUITABILITY SCORE -----")
 score = calculate_suitability("test.jpg")
 print(score)
 
+
+print("\n----- NDVI (offline fixture) -----")
+ndvi = ndvi_stats("test_bands.npy")
+print(ndvi)
+print(calculate_suitability("test.jpg", ndvi=ndvi))
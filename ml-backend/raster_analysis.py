@@ -0,0 +1,179 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+from classification.land_classifier import classify_land
+from change_detection.change_detector import detect_change, render_change_overlay_jpeg
+from suitability.scoring import calculate_suitability
+from imaging.loader import image_file_key, load_image
+from imaging.stats import raster_stats
+
+# Worker processes for CPU-bound raster analysis
+RASTER_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+# Jobs allowed to wait or run at once; beyond this new jobs are refused
+RASTER_MAX_PENDING = int(os.environ.get("RASTER_MAX_PENDING", RASTER_WORKERS * 4))
+# Workers start from a clean process instead of forking the app, which by then
+# holds threads, locks and open HTTP clients that a forked child would inherit
+RASTER_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def analyze_rasters(test_path="test.jpg", old_path="old.jpg", new_path="new.jpg"):
+    """
+    Land classification, change detection and suitability for one set of inputs.
+    Takes paths rather than arrays so it can run in a worker process without
+    pickling pixels; each worker keeps its own decoded-image cache.
+    """
+    test_image = load_image(test_path)
+    test_stats = raster_stats(test_image)
+
+    return {
+        "land_classification": classify_land(test_image, stats=test_stats),
+        "change_detection": detect_change(load_image(old_path), load_image(new_path)),
+        "suitability": calculate_suitability(test_image, stats=test_stats),
+    }
+
+
+def render_overlay(old_path, new_path, file_keys=None):
+    """
+    JPEG change overlay of two image files, for rendering in a worker process.
+    With `file_keys` (their image_file_key at registration), returns None if
+    either file changed since, before or while it was read.
+    """
+    def unchanged():
+        return file_keys is None or (image_file_key(old_path), image_file_key(new_path)) == tuple(file_keys)
+
+    if not unchanged():
+        return None
+    old_image, new_image = load_image(old_path), load_image(new_path)
+    if not unchanged():
+        return None
+    return render_change_overlay_jpeg(old_image, new_image)
+
+
+class RasterQueueFull(Exception):
+    """Raised when the raster executor already has its maximum number of pending jobs."""
+
+
+class BoundedRasterExecutor(Executor):
+    """
+    Process pool for raster jobs with a cap on queued + running jobs, so a
+    burst of heavy image work is refused early instead of piling up behind
+    the workers. Tracks queue depth and job timings for monitoring.
+    """
+
+    def __init__(self, max_workers: int = RASTER_WORKERS, max_pending: int = RASTER_MAX_PENDING):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._pool = ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context(RASTER_START_METHOD)
+        )
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.peak_pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._total_seconds = 0.0
+
+    def submit(self, fn, /, *args, **kwargs):
+        """Queues a job; raises RasterQueueFull instead of waiting when the queue is full."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise RasterQueueFull(f"{self.max_pending} raster jobs already pending")
+        return self._submit(fn, *args, **kwargs)
+
+    def submit_blocking(self, fn, *args, timeout: float = None):
+        """Queues a job, waiting up to `timeout` seconds for room (for callers on worker threads)."""
+        if not self._slots.acquire(timeout=timeout):
+            with self._lock:
+                self.rejected += 1
+            raise RasterQueueFull(f"No room for a raster job after {timeout} s")
+        return self._submit(fn, *args)
+
+    def _submit(self, fn, *args, **kwargs):
+        started = time.monotonic()
+        with self._lock:
+            self.pending += 1
+            self.submitted += 1
+            self.peak_pending = max(self.peak_pending, self.pending)
+
+        def done(future):
+            self._slots.release()
+            with self._lock:
+                self.pending -= 1
+                self._total_seconds += time.monotonic() - started
+                if future.cancelled() or future.exception() is not None:
+                    self.failed += 1
+                else:
+                    self.completed += 1
+
+        try:
+            future = self._pool.submit(fn, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            with self._lock:
+                self.pending -= 1
+                self.submitted -= 1
+            raise
+        future.add_done_callback(done)
+        return future
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self._pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    def stats(self):
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                "workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "peak_pending": self.peak_pending,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "avg_job_seconds": round(self._total_seconds / finished, 3) if finished else None,
+            }
+
+
+def get_raster_executor():
+    """
+    Bounded process pool shared by the analysis endpoints. The app creates it
+    at startup; scripts get one on first use.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = BoundedRasterExecutor()
+        return _executor
+
+
+def submit_raster_job(fn, *args):
+    """
+    Queues a raster job and returns an awaitable for its result.
+    Raises RasterQueueFull right away when the pool is saturated.
+    """
+    return asyncio.wrap_future(get_raster_executor().submit(fn, *args))
+
+
+def raster_executor_stats():
+    with _executor_lock:
+        return None if _executor is None else _executor.stats()
+
+
+def shutdown_raster_executor():
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
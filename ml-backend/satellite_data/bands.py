@@ -0,0 +1,58 @@
+import math
+
+import numpy as np
+
+from satellite_data.fetch_images import build_collection
+from satellite_data.preprocessing import create_region
+from satellite_data.session import get_ee
+
+# Red and near-infrared, in the order imaging.vegetation expects
+NDVI_RAW_BANDS = ["B4", "B8"]
+# Native Sentinel-2 resolution of B4/B8
+BAND_SCALE_M = 10
+
+METERS_PER_DEGREE = 111320
+
+
+def pixel_grid(lat, lon, buffer_m=1000, scale_m=BAND_SCALE_M):
+    """
+    EPSG:4326 pixel grid covering the square around the buffered point,
+    at roughly `scale_m` metres per pixel.
+    """
+    size = max(1, round(2 * buffer_m / scale_m))
+    deg_lat = scale_m / METERS_PER_DEGREE
+    deg_lon = scale_m / (METERS_PER_DEGREE * math.cos(math.radians(lat)))
+
+    return {
+        "dimensions": {"width": size, "height": size},
+        "affineTransform": {
+            "scaleX": deg_lon,
+            "shearX": 0,
+            "translateX": lon - deg_lon * size / 2,
+            "shearY": 0,
+            "scaleY": -deg_lat,
+            "translateY": lat + deg_lat * size / 2,
+        },
+        "crsCode": "EPSG:4326",
+    }
+
+
+def get_bands(lat, lon, start_date, end_date, buffer_m=1000, collection=None):
+    """
+    Raw B4/B8 reflectance of the least cloudy scene as a uint16 array of
+    shape (height, width, 2), downloaded in one computePixels call.
+    """
+    ee = get_ee()
+    if collection is None:
+        collection = build_collection(create_region(lat, lon, buffer_m), start_date, end_date)
+
+    image = collection.first().select(NDVI_RAW_BANDS)
+
+    pixels = ee.data.computePixels({
+        "expression": image,
+        "fileFormat": "NUMPY_NDARRAY",
+        "grid": pixel_grid(lat, lon, buffer_m),
+    })
+
+    # Structured array with one field per band; masked pixels come back as 0
+    return np.stack([pixels[band] for band in NDVI_RAW_BANDS], axis=-1).astype(np.uint16)
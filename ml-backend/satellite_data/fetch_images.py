@@ -1,9 +1,34 @@
-import ee
+from satellite_data.session import get_ee
 
-ee.Initialize(project="land-487310")
+RGB_BANDS = ["B4", "B3", "B2"]
+RGB_VIS = {
+    "dimensions": 512,
+    "min": 0,
+    "max": 3000,
+}
 
-def get_image(region, start_date, end_date):
-    collection = (
+class NoImagery(Exception):
+    """Raised when a region has no usable scene in a date window."""
+
+
+def collection_is_empty(collection):
+    """
+    Whether a collection is known to have no scenes (one Earth Engine
+    round-trip); False when Earth Engine cannot tell either.
+    """
+    try:
+        return collection.size().getInfo() == 0
+    except Exception:
+        return False
+
+
+def build_collection(region, start_date, end_date):
+    """
+    Sentinel-2 surface reflectance for a region and date window, least cloudy first.
+    Build it once and pass it to get_image / get_ndvi to share it between both.
+    """
+    ee = get_ee()
+    return (
         ee.ImageCollection("COPERNICUS/S2_SR_HARMONIZED")
         .filterBounds(region)
         .filterDate(start_date, end_date)
@@ -11,13 +36,13 @@ def get_image(region, start_date, end_date):
         .sort("CLOUDY_PIXEL_PERCENTAGE")
     )
 
-    image = collection.first().select(["B4", "B3", "B2"])
 
-    url = image.getThumbURL({
-        "region": region,
-        "dimensions": 512,
-        "min": 0,
-        "max": 3000,
-    })
+def get_image(region, start_date, end_date, collection=None):
+    if collection is None:
+        collection = build_collection(region, start_date, end_date)
+
+    image = collection.first().select(RGB_BANDS)
+
+    url = image.getThumbURL({"region": region, **RGB_VIS})
 
     return url
@@ -0,0 +1,156 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from datetime import date
+from pathlib import Path
+
+# Centroids are rounded to ~11 m before keying; thumbnails of a 1 km buffer
+# are indistinguishable below that
+CENTROID_DECIMALS = 4
+
+# Earth Engine thumbnail URLs are signed and stop working after a few hours,
+# so URLs are reused for a while even when the imagery behind them never changes
+THUMBNAIL_URL_TTL = float(os.environ.get("THUMBNAIL_URL_TTL", 2 * 3600))
+# Windows that are still open gain new scenes; their downloaded bytes are refetched daily
+OPEN_WINDOW_TTL = 24 * 3600
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parents[1] / "cache" / "imagery.sqlite3"
+CACHE_PATH = Path(os.environ.get("IMAGERY_CACHE_PATH", DEFAULT_CACHE_PATH))
+CACHE_MAX_BYTES = int(os.environ.get("IMAGERY_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+def imagery_key(kind, lat, lon, buffer_m, start_date, end_date, vis):
+    """Cache key for one thumbnail or band array: region, date window and visualization params."""
+    parts = (
+        kind,
+        round(lat, CENTROID_DECIMALS),
+        round(lon, CENTROID_DECIMALS),
+        buffer_m,
+        start_date,
+        end_date,
+        sorted(vis.items()),
+    )
+    return hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+def window_closed(end_date, today=None):
+    """True once the whole date window is in the past, i.e. its composite can no longer change."""
+    today = today or date.today()
+    return date.fromisoformat(end_date) < today
+
+class ImageryCache:
+    """
+    Thumbnail URLs in memory; downloaded thumbnails and band arrays as bytes in SQLite.
+    Bytes for closed windows never expire; the on-disk store is kept under
+    `max_bytes` by dropping the least recently used images.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes: int = CACHE_MAX_BYTES, url_ttl: float = THUMBNAIL_URL_TTL):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.url_ttl = url_ttl
+        self.url_hits = 0
+        self.url_misses = 0
+        self.byte_hits = 0
+        self.byte_misses = 0
+        self.evictions = 0
+        self._urls = {}
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS thumbnails ("
+                " key TEXT PRIMARY KEY,"
+                " body BLOB NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " expires_at REAL,"
+                " used_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get_url(self, key):
+        with self._lock:
+            entry = self._urls.get(key)
+            if entry is None or entry[0] <= time.time():
+                self._urls.pop(key, None)
+                self.url_misses += 1
+                return None
+            self.url_hits += 1
+            return entry[1]
+
+    def set_url(self, key, url):
+        if url is None:
+            return
+        with self._lock:
+            now = time.time()
+            self._urls[key] = (now + self.url_ttl, url)
+            # Expired URLs are useless; drop them instead of letting the dict grow
+            for stale in [k for k, (expires_at, _) in self._urls.items() if expires_at <= now]:
+                del self._urls[stale]
+
+    def get_bytes(self, key):
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT body, expires_at FROM thumbnails WHERE key = ?", (key,)).fetchone()
+            if row is None or (row[1] is not None and row[1] <= time.time()):
+                self.byte_misses += 1
+                return None
+
+            conn.execute("UPDATE thumbnails SET used_at = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+            self.byte_hits += 1
+            return row[0]
+
+    def set_bytes(self, key, body, ttl: float = None):
+        """Stores downloaded image bytes; a ttl of None keeps them until evicted."""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO thumbnails (key, body, size, expires_at, used_at) VALUES (?, ?, ?, ?, ?)",
+                (key, body, len(body), None if ttl is None else now + ttl, now),
+            )
+            conn.execute("DELETE FROM thumbnails WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+            self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM thumbnails").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute("SELECT key, size FROM thumbnails ORDER BY used_at").fetchall():
+            conn.execute("DELETE FROM thumbnails WHERE key = ?", (key,))
+            self.evictions += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self):
+        with self._lock:
+            count, size = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM thumbnails"
+            ).fetchone()
+            return {
+                "urls": len(self._urls),
+                "url_hits": self.url_hits,
+                "url_misses": self.url_misses,
+                "images": count,
+                "image_bytes": size,
+                "max_bytes": self.max_bytes,
+                "image_hits": self.byte_hits,
+                "image_misses": self.byte_misses,
+                "evictions": self.evictions,
+            }
+
+imagery_cache = ImageryCache()
@@ -1,41 +1,35 @@
-import ee
+from satellite_data.fetch_images import build_collection
 
-# Initialize Earth Engine
-ee.Initialize(project="land-487310")
+NDVI_BANDS = ["B8", "B4"]
+NDVI_VIS = {
+    "dimensions": 512,
+    "min": -1,
+    "max": 1,
+    "palette": ["red", "yellow", "green"]
+}
 
-# Define region (same coordinates)
-point = ee.Geometry.Point([79.1333, 12.9692])
-region = point.buffer(1000)
 
-
-def get_ndvi(region, start_date, end_date):
-    collection = (
-        ee.ImageCollection("COPERNICUS/S2_SR_HARMONIZED")
-        .filterBounds(region)
-        .filterDate(start_date, end_date)
-        .filter(ee.Filter.lt("CLOUDY_PIXEL_PERCENTAGE", 20))
-        .sort("CLOUDY_PIXEL_PERCENTAGE")
-    )
+def get_ndvi(region, start_date, end_date, collection=None):
+    if collection is None:
+        collection = build_collection(region, start_date, end_date)
 
     image = collection.first()
 
     # Calculate NDVI
-    ndvi = image.normalizedDifference(["B8", "B4"])
+    ndvi = image.normalizedDifference(NDVI_BANDS)
 
     # Generate NDVI visualization URL
-    url = ndvi.getThumbURL({
-        "region": region,
-        "dimensions": 512,
-        "min": -1,
-        "max": 1,
-        "palette": ["red", "yellow", "green"]
-    })
+    url = ndvi.getThumbURL({"region": region, **NDVI_VIS})
 
     return url
 
 
 # Test run
 if __name__ == "__main__":
-    ndvi_url = get_ndvi("2024-01-01", "2024-12-31")
+    from satellite_data.preprocessing import create_region
+
+    # Define region (same coordinates)
+    region = create_region(12.9692, 79.1333)
+    ndvi_url = get_ndvi(region, "2024-01-01", "2024-12-31")
     print("\nNDVI MAP URL:")
     print(ndvi_url)
@@ -1,30 +1,227 @@
-from satellite_data.fetch_images import get_image
-from satellite_data.ndvi import get_ndvi
+from concurrent.futures import ThreadPoolExecutor
+
+import io
+
+import httpx
+import numpy as np
+
+from imaging.vegetation import ndvi_stats
+from satellite_data.bands import BAND_SCALE_M, NDVI_RAW_BANDS, get_bands
+from satellite_data.fetch_images import (
+    RGB_BANDS,
+    RGB_VIS,
+    NoImagery,
+    build_collection,
+    collection_is_empty,
+    get_image,
+)
+from satellite_data.imagery_cache import OPEN_WINDOW_TTL, imagery_cache, imagery_key, window_closed
+from satellite_data.ndvi import NDVI_BANDS, NDVI_VIS, get_ndvi
 from satellite_data.preprocessing import create_region
 
+# Each getThumbURL is a blocking Earth Engine round-trip; run them side by side.
+# Jobs on this pool never submit to it themselves, so it cannot deadlock.
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="earth-engine")
+# Thumbnail downloads get a pool of their own for the same reason
+_download_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="thumbnail-download")
+
+DEFAULT_YEARS = (2020, 2024)
+DEFAULT_BUFFER_M = 1000
+DOWNLOAD_TIMEOUT = 60
+
+# Thumbnail kind -> (fetch function, everything that changes how it renders)
+THUMBNAILS = {
+    "rgb": (get_image, {"bands": RGB_BANDS, **RGB_VIS}),
+    "ndvi": (get_ndvi, {"bands": NDVI_BANDS, **NDVI_VIS}),
+}
+
+
+def year_window(year):
+    return f"{year}-01-01", f"{year}-12-31"
+
+
+def window_ttl(year):
+    """Closed years are cached until evicted; the current year is refetched daily."""
+    return None if window_closed(year_window(year)[1]) else OPEN_WINDOW_TTL
+
+
+def thumbnail_key(kind, lat, lon, year, buffer_m=DEFAULT_BUFFER_M):
+    return imagery_key(kind, lat, lon, buffer_m, *year_window(year), THUMBNAILS[kind][1])
+
+
+def no_imagery_key(lat, lon, year, buffer_m=DEFAULT_BUFFER_M):
+    """Cache key marking a year with no usable scene for the region."""
+    return imagery_key("no-imagery", lat, lon, buffer_m, *year_window(year), {})
+
+
+def _no_imagery(year):
+    return NoImagery(f"No Sentinel-2 scene for {year}")
+
+
+def get_thumbnail_urls(lat, lon, wanted, buffer_m=DEFAULT_BUFFER_M, errors=None):
+    """
+    Thumbnail URLs for (kind, year) pairs. Cached URLs are reused; only the
+    missing ones build a collection and go to Earth Engine, concurrently.
+    Years found to have no scene raise NoImagery, and that is cached like the
+    imagery itself, so closed years are not asked for again.
+    With an `errors` dict, failed pairs are recorded there and left out
+    instead of raising.
+    """
+    keys = {item: thumbnail_key(item[0], lat, lon, item[1], buffer_m) for item in wanted}
+    urls = {item: imagery_cache.get_url(keys[item]) for item in wanted}
+    missing = [item for item in wanted if urls[item] is None]
+    if not missing:
+        return urls
+
+    failed = {}
+    # Years known to have no scene fail without another Earth Engine request
+    for item in missing:
+        if imagery_cache.get_bytes(no_imagery_key(lat, lon, item[1], buffer_m)) is not None:
+            failed[item] = _no_imagery(item[1])
+
+    requested = [item for item in missing if item not in failed]
+    if requested:
+        # Create region from coordinates
+        region = create_region(lat, lon, buffer_m)
+
+        # One collection per year, shared by every thumbnail of that year
+        collections = {year: build_collection(region, *year_window(year)) for year in {year for _, year in requested}}
+
+        futures = {
+            (kind, year): _executor.submit(THUMBNAILS[kind][0], region, *year_window(year), collection=collections[year])
+            for kind, year in requested
+        }
+        for item, future in futures.items():
+            try:
+                urls[item] = future.result()
+            except Exception as e:
+                failed[item] = e
+                continue
+            imagery_cache.set_url(keys[item], urls[item])
+
+        # An empty window fails like any other request; one more call tells them apart
+        for year in sorted({year for kind, year in requested if (kind, year) in failed}):
+            if collection_is_empty(collections[year]):
+                imagery_cache.set_bytes(no_imagery_key(lat, lon, year, buffer_m), b"1", ttl=window_ttl(year))
+                for item in requested:
+                    if item[1] == year and item in failed:
+                        failed[item] = _no_imagery(year)
+
+    for item, e in failed.items():
+        if errors is None:
+            raise e
+        errors[item] = e
+        del urls[item]
+    return urls
+
+
+def _download_thumbnail(url, key, year):
+    response = httpx.get(url, timeout=DOWNLOAD_TIMEOUT, follow_redirects=True)
+    response.raise_for_status()
+    body = response.content
+
+    imagery_cache.set_bytes(key, body, ttl=window_ttl(year))
+    return body
+
+
+def get_thumbnail_bytes(lat, lon, year, kind="rgb", buffer_m=DEFAULT_BUFFER_M):
+    """
+    Downloaded thumbnail image, kept on disk.
+    """
+    key = thumbnail_key(kind, lat, lon, year, buffer_m)
+    body = imagery_cache.get_bytes(key)
+    if body is not None:
+        return body
+
+    url = get_thumbnail_urls(lat, lon, [(kind, year)], buffer_m)[(kind, year)]
+    return _download_thumbnail(url, key, year)
+
+
+def get_thumbnails_bytes(lat, lon, wanted, buffer_m=DEFAULT_BUFFER_M):
+    """
+    Downloaded thumbnails for several (kind, year) pairs, as ({pair: bytes},
+    {pair: exception}). Missing URLs are requested together from the calling
+    thread; the downloads then run side by side.
+    """
+    keys = {item: thumbnail_key(item[0], lat, lon, item[1], buffer_m) for item in wanted}
+    bodies = {}
+    for item in wanted:
+        body = imagery_cache.get_bytes(keys[item])
+        if body is not None:
+            bodies[item] = body
+
+    errors = {}
+    missing = [item for item in wanted if item not in bodies]
+    if not missing:
+        return bodies, errors
+
+    urls = get_thumbnail_urls(lat, lon, missing, buffer_m, errors=errors)
+    futures = {
+        item: _download_executor.submit(_download_thumbnail, url, keys[item], item[1])
+        for item, url in urls.items()
+    }
+    for item, future in futures.items():
+        try:
+            bodies[item] = future.result()
+        except Exception as e:
+            errors[item] = e
+    return bodies, errors
+
+
+def get_ndvi_bands(lat, lon, year, buffer_m=DEFAULT_BUFFER_M):
+    """
+    Red/NIR array for one year, fetched from Earth Engine once and then
+    served from the on-disk cache as .npy bytes.
+    """
+    key = imagery_key(
+        "bands", lat, lon, buffer_m, *year_window(year), {"bands": NDVI_RAW_BANDS, "scale": BAND_SCALE_M}
+    )
+    body = imagery_cache.get_bytes(key)
+    if body is not None:
+        return np.load(io.BytesIO(body), allow_pickle=False)
+
+    bands = get_bands(lat, lon, *year_window(year), buffer_m=buffer_m)
+    buffer = io.BytesIO()
+    np.save(buffer, bands, allow_pickle=False)
+    imagery_cache.set_bytes(key, buffer.getvalue(), ttl=window_ttl(year))
+    return bands
+
+
+def get_ndvi_stats(lat, lon, year, buffer_m=DEFAULT_BUFFER_M):
+    """NDVI statistics computed locally from the cached red/NIR array."""
+    return ndvi_stats(get_ndvi_bands(lat, lon, year, buffer_m))
+
 
-def get_land_data(lat, lon):
+def get_land_data(lat, lon, years=DEFAULT_YEARS, buffer_m=DEFAULT_BUFFER_M):
     """
     Main pipeline function that returns:
-    - Old satellite image
-    - New satellite image
-    - NDVI vegetation map
+    - Old satellite image (first year)
+    - New satellite image (last year)
+    - NDVI vegetation map (last year)
+    - NDVI statistics (last year), None if the bands could not be fetched
+    - Images for every requested year
     """
+    years = sorted(set(years))
+    latest = years[-1]
 
-    # Create region from coordinates
-    region = create_region(lat, lon)
+    # The band download runs alongside the thumbnail requests
+    stats_future = _executor.submit(get_ndvi_stats, lat, lon, latest, buffer_m)
 
-    # Fetch images
-    old_image_url = get_image(region, "2020-01-01", "2020-12-31")
-    new_image_url = get_image(region, "2024-01-01", "2024-12-31")
+    urls = get_thumbnail_urls(lat, lon, [("rgb", year) for year in years] + [("ndvi", latest)], buffer_m)
+    images = {year: urls[("rgb", year)] for year in years}
 
-    # Generate NDVI map
-    ndvi_url = get_ndvi(region, "2024-01-01", "2024-12-31")
+    try:
+        stats = stats_future.result()
+    except Exception as e:
+        print(f"NDVI statistics unavailable: {e}")
+        stats = None
 
     return {
-        "old_image": old_image_url,
-        "new_image": new_image_url,
-        "ndvi": ndvi_url,
+        "old_image": images[years[0]],
+        "new_image": images[latest],
+        "ndvi": urls[("ndvi", latest)],
+        "ndvi_stats": stats,
+        "images": images,
     }
 
 
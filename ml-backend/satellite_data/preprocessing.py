@@ -1,13 +1,11 @@
-import ee
-
-# Initialize Earth Engine
-ee.Initialize(project="land-487310")
+from satellite_data.session import get_ee
 
 
 def create_region(lat, lon, buffer_m=1000):
     """
     Converts latitude & longitude into Earth Engine region.
     """
+    ee = get_ee()
     point = ee.Geometry.Point([lon, lat])
     region = point.buffer(buffer_m)
     return region
@@ -0,0 +1,26 @@
+import os
+import threading
+
+import ee
+
+# Google Cloud project used for Earth Engine requests
+EE_PROJECT = os.environ.get("EE_PROJECT", "land-487310")
+
+_lock = threading.Lock()
+_initialized = False
+
+
+def get_ee():
+    """
+    Returns the Earth Engine module, initializing the session on first use.
+    Importing the satellite_data modules does no network I/O; the first imagery
+    request pays for authentication once, and concurrent first requests wait
+    for that single initialization.
+    """
+    global _initialized
+    if not _initialized:
+        with _lock:
+            if not _initialized:
+                ee.Initialize(project=EE_PROJECT)
+                _initialized = True
+    return ee
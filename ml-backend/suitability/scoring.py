@@ -1,24 +1,28 @@
-import cv2
-import numpy as np
-
-def calculate_ndvi_like(image_path):
-    img = cv2.imread(image_path)
-    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-
-    # Split channels
-    r = img[:, :, 0].astype(float)
-    g = img[:, :, 1].astype(float)
-    b = img[:, :, 2].astype(float)
+from imaging.stats import raster_stats
 
+def calculate_ndvi_like(image):
     # NDVI-like index (since no NIR band)
-    vegetation_index = np.mean(g / (r + b + 1e-5))
+    return raster_stats(image)["vegetation_index"]
 
-    return vegetation_index
 
+def calculate_suitability(image, rainfall=0.7, soil_quality=0.6, stats=None, ndvi=None):
+    """
+    `image` is a path or an already decoded BGR array; pass precomputed
+    `raster_stats` to avoid another pass over the pixels.
 
-def calculate_suitability(image_path, rainfall=0.7, soil_quality=0.6):
+    When Sentinel-2 `ndvi` statistics (imaging.vegetation.ndvi_stats) are
+    available the score uses the real mean NDVI and the image is not read.
+    """
 
-    ndvi_like = calculate_ndvi_like(image_path)
+    if ndvi is not None:
+        # Bare soil, water and built-up land all score zero vegetation
+        ndvi_like = min(max(ndvi["mean"], 0.0), 1.0)
+        source = "sentinel2_ndvi"
+    else:
+        if stats is None:
+            stats = raster_stats(image)
+        ndvi_like = stats["vegetation_index"]
+        source = "rgb_proxy"
 
     score = (
         ndvi_like * 0.5 +
@@ -28,6 +32,7 @@ def calculate_suitability(image_path, rainfall=0.7, soil_quality=0.6):
 
     return {
     "ndvi_like": float(round(ndvi_like, 2)),
-    "suitability_score": float(round(score * 100, 2))
+    "suitability_score": float(round(score * 100, 2)),
+    "vegetation_source": source
 }
 
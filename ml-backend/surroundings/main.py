@@ -1,17 +1,21 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, HTTPException, Query
 
 router = APIRouter()
 
 @router.get("/surroundings")
-def analyze_surroundings(lat: float = Query(...), lon: float = Query(...)):
+def analyze_surroundings(lat: float = Query(...), lon: float = Query(...), weighting: str = Query("count")):
     """
     Analyzes surrounding land within 300m radius using OpenStreetMap data.
-    Returns dominant zone and percentage breakdown.
+    Returns dominant zone and percentage breakdown. weighting="area" weights
+    polygons by the area they cover instead of a fixed weight per feature.
     """
-    from .service import analyze_surrounding_land
-    
+    from .service import WEIGHTINGS, analyze_surrounding_land
+
+    if weighting not in WEIGHTINGS:
+        raise HTTPException(status_code=400, detail=f"weighting must be one of {', '.join(WEIGHTINGS)}")
+
     fixed_radius = 300
-    surroundings_data = analyze_surrounding_land(lat, lon, fixed_radius)
+    surroundings_data = analyze_surrounding_land(lat, lon, fixed_radius, weighting)
     
     return {
         "coordinates": {"lat": lat, "lon": lon},
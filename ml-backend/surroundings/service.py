@@ -1,126 +1,281 @@
-import requests
+import math
+import re
 
-OVERPASS_URLS = [
-    "https://overpass-api.de/api/interpreter",
-    "https://overpass.kumi.systems/api/interpreter"
-]
+from services.cache import TTLCache
+from services.feature_store import LAND_FILTERS, LAND_LAYER, features_within, osm_features
+from services.overpass_client import overpass
+from services.tile_cache import TILE_TTL, tiles_covering
 
-def analyze_surrounding_land(lat: float, lon: float, radius: int = 300):
-    query = f"""
-    [out:json][timeout:25];
+from .geometry import element_rings, ring_table, table_areas, table_bytes
+
+WEIGHTINGS = ("count", "area")
+
+# `out geom` responses are kept per rounded centroid (~11 m) and radius, packed into
+# flat vertex arrays (a dense city circle: ~0.3 MB of vertices, ~1 MB of tags) and
+# bounded by their approximate size
+GEOMETRY_CACHE_SIZE = 256
+GEOMETRY_CACHE_MAX_BYTES = 64 * 1024 * 1024
+GEOMETRY_QUERY_TIMEOUT = 60
+# A parsed tag dict with one or two short tags
+TAGS_BYTES = 400
+_geometry_cache = TTLCache(maxsize=GEOMETRY_CACHE_SIZE, ttl=TILE_TTL, maxweight=GEOMETRY_CACHE_MAX_BYTES)
+
+def analyze_surrounding_land(lat: float, lon: float, radius: int = 300, weighting: str = "count"):
+    """
+    Landuse/natural/building/highway features around a point, scored into zones.
+    Features come from the OSM feature store shared with the Safety place lookups.
+    With weighting="area", polygons are fetched with their geometry instead and
+    weighted by how much of the radius circle they cover.
+    """
+    if weighting == "area":
+        return analyze_surrounding_area(lat, lon, radius)
+
+    tile_map = osm_features.get_tiles(tiles_covering(lat, lon, radius), layer=LAND_LAYER)
+    if tile_map is None:
+        return {"error": "Failed to fetch surroundings data"}
+
+    try:
+        # Ways and relations count when one of their lines reaches into the radius, as with `around`
+        elements = features_within(tile_map, lat, lon, radius, LAND_FILTERS, to_geometry=True)
+        return score_surroundings(elements, radius)
+    except Exception as e:
+        print(f"Surroundings Analyzer Error: {e}")
+        return {"error": "Failed to fetch surroundings data"}
+
+# Checked in this order; a tag goes to the first category with a keyword inside it
+SURROUNDING_CATEGORIES = {
+    "Agriculture": ["farmland", "farmyard", "orchard", "vineyard", "meadow", "greenhouse"],
+    "Residential": ["residential", "apartments", "house", "detached"],
+    "Commercial & Retail": ["commercial", "retail", "supermarket", "mall"],
+    "Industrial": ["industrial", "warehouse", "manufacturing", "brownfield", "construction"],
+    "Nature & Parks": ["forest", "wood", "nature_reserve", "park", "water", "grass", "scrub"],
+    "Institutional": ["institutional", "education", "school", "hospital", "religious", "university"]
+}
+OTHER_CATEGORY = "Mixed / Other"
+UNPAVED_HIGHWAYS = frozenset(["track", "path", "footway"])
+
+# Tag values seen so far are remembered; OSM values are free text, so the memo is capped
+MAX_MEMO_TAGS = 4096
+
+# Every keyword in one alternation, ordered by category. A lookahead match is found
+# at each position, and where keywords start at the same position the earlier
+# category wins, so the lowest category index over all matches is the answer.
+_CATEGORY_NAMES = list(SURROUNDING_CATEGORIES)
+_KEYWORD_CATEGORY = {}
+for _index, _keywords in enumerate(SURROUNDING_CATEGORIES.values()):
+    for _keyword in _keywords:
+        _KEYWORD_CATEGORY.setdefault(_keyword, _index)
+_KEYWORD_PATTERN = re.compile("(?=(" + "|".join(map(re.escape, _KEYWORD_CATEGORY)) + "))")
+
+def _match_category(tag: str):
+    indices = [_KEYWORD_CATEGORY[keyword] for keyword in _KEYWORD_PATTERN.findall(tag)]
+    return _CATEGORY_NAMES[min(indices)] if indices else OTHER_CATEGORY
+
+# Exact tag value -> category, seeded with the keywords themselves
+_tag_categories = {keyword: _match_category(keyword) for keyword in _KEYWORD_CATEGORY}
+
+def classify_tag(value: str):
+    """Zone for a landuse/natural/building value (compared lower-cased, by substring)."""
+    category = _tag_categories.get(value)
+    if category is None:
+        category = _match_category(value.lower())
+        if len(_tag_categories) < MAX_MEMO_TAGS:
+            _tag_categories[value] = category
+    return category
+
+_NO_TAGS = {}
+
+def score_surroundings(elements, radius: int):
+    """
+    Turns Overpass landuse/natural/building/highway elements into a zone breakdown.
+    """
+    scores = {key: 0.0 for key in SURROUNDING_CATEGORIES}
+    scores[OTHER_CATEGORY] = 0.0
+
+    total_points = 0.0
+    road_count = 0
+
+    for el in elements:
+        tags = el.get("tags", _NO_TAGS)
+
+        highway = tags.get("highway")
+        if highway is not None:
+            if highway not in UNPAVED_HIGHWAYS:
+                road_count += 1
+            continue
+
+        # Land polygons outweigh single buildings; an untyped building counts as residential
+        land_type = tags.get("landuse") or tags.get("natural")
+        if land_type:
+            feature_weight = 10.0
+            category = classify_tag(land_type)
+        else:
+            building_type = tags.get("building")
+            if not building_type:
+                continue
+            feature_weight = 1.0
+            category = classify_tag("residential" if building_type == "yes" else building_type)
+
+        total_points += feature_weight
+        scores[category] += feature_weight
+
+    is_rural = False
+    missing_space = 0.0
+
+    if total_points < 30 and road_count < 15:
+        is_rural = True
+        missing_space = 100.0 - total_points
+        if missing_space > 0:
+            scores["Agriculture"] += (missing_space * 0.85)
+            scores["Nature & Parks"] += (missing_space * 0.15)
+            total_points += missing_space
+
+    elif total_points < 30 and road_count >= 15:
+        missing_space = 100.0 - total_points
+        if missing_space > 0:
+            scores["Residential"] += (missing_space * 0.80)
+            scores["Commercial & Retail"] += (missing_space * 0.20)
+            total_points += missing_space
+
+    if total_points == 0:
+        return {"error": "No data found in this area"}
+
+    percentages = {}
+    for category, score in scores.items():
+        pct = (score / total_points) * 100
+        percentages[category] = round(pct, 1)
+
+    dominant_category = max(percentages, key=percentages.get)
+    original_weight = total_points - missing_space
+
+    return {
+        "radius_meters": radius,
+        "dominant_zone": dominant_category,
+        "ai_context_summary": f"Context: {percentages[dominant_category]}% {dominant_category} environment.",
+        "area_profile_percentages": percentages,
+        "diagnostics": {
+            "is_rural_deduced": is_rural,
+            "paved_roads_found": road_count,
+            "mapped_structures_weight": round(original_weight, 1)
+        }
+    }
+
+def build_geometry_query(lat: float, lon: float, radius: int, timeout: int = GEOMETRY_QUERY_TIMEOUT):
+    """Land polygons with their geometry, and road tags, within `radius` of the point."""
+    around = f"(around:{radius},{lat},{lon})"
+    return f"""
+    [out:json][timeout:{timeout}];
     (
-      way["landuse"](around:{radius},{lat},{lon});
-      relation["landuse"](around:{radius},{lat},{lon});
-      way["natural"](around:{radius},{lat},{lon});
-      relation["natural"](around:{radius},{lat},{lon});
-      way["building"](around:{radius},{lat},{lon});
-      way["highway"](around:{radius},{lat},{lon});
+      way["landuse"]{around};
+      relation["landuse"]["type"="multipolygon"]{around};
+      way["natural"]{around};
+      relation["natural"]["type"="multipolygon"]{around};
+      way["building"]{around};
     );
+    out geom;
+    way["highway"]{around};
     out tags;
     """
-    
-    for url in OVERPASS_URLS:
-        try:
-            response = requests.post(url, data={"data": query}, timeout=15)
-            if response.status_code != 200:
-                continue
 
-            elements = response.json().get("elements", [])
-            
-            categories = {
-                "Agriculture": ["farmland", "farmyard", "orchard", "vineyard", "meadow", "greenhouse"],
-                "Residential": ["residential", "apartments", "house", "detached"],
-                "Commercial & Retail": ["commercial", "retail", "supermarket", "mall"],
-                "Industrial": ["industrial", "warehouse", "manufacturing", "brownfield", "construction"],
-                "Nature & Parks": ["forest", "wood", "nature_reserve", "park", "water", "grass", "scrub"],
-                "Institutional": ["institutional", "education", "school", "hospital", "religious", "university"]
-            }
-            
-            scores = {key: 0.0 for key in categories.keys()}
-            scores["Mixed / Other"] = 0.0
-            
-            total_points = 0.0
-            road_count = 0
-            
-            for el in elements:
-                tags = el.get("tags", {})
-                
-                if "highway" in tags:
-                    if tags["highway"] not in ["track", "path", "footway"]:
-                        road_count += 1
-                    continue
-
-                land_type = tags.get("landuse") or tags.get("natural")
-                building_type = tags.get("building")
-                
-                feature_weight = 0.0
-                primary_tag = ""
-
-                if land_type:
-                    feature_weight = 10.0  
-                    primary_tag = land_type.lower()
-                elif building_type:
-                    feature_weight = 1.0   
-                    primary_tag = building_type.lower() if building_type != "yes" else "residential"
-                
-                if not primary_tag or feature_weight == 0:
-                    continue
-                    
-                total_points += feature_weight
-                matched = False
-                
-                for category, keywords in categories.items():
-                    if any(kw in primary_tag for kw in keywords):
-                        scores[category] += feature_weight
-                        matched = True
-                        break
-                
-                if not matched:
-                    scores["Mixed / Other"] += feature_weight
-
-            is_rural = False
-            missing_space = 0.0
-            
-            if total_points < 30 and road_count < 15:
-                is_rural = True
-                missing_space = 100.0 - total_points
-                if missing_space > 0:
-                    scores["Agriculture"] += (missing_space * 0.85)
-                    scores["Nature & Parks"] += (missing_space * 0.15)
-                    total_points += missing_space
-                    
-            elif total_points < 30 and road_count >= 15:
-                missing_space = 100.0 - total_points
-                if missing_space > 0:
-                    scores["Residential"] += (missing_space * 0.80)
-                    scores["Commercial & Retail"] += (missing_space * 0.20)
-                    total_points += missing_space
-
-            if total_points == 0:
-                return {"error": "No data found in this area"}
-
-            percentages = {}
-            for category, score in scores.items():
-                pct = (score / total_points) * 100
-                percentages[category] = round(pct, 1)
-                
-            dominant_category = max(percentages, key=percentages.get)
-            original_weight = total_points - missing_space
-            
-            return {
-                "radius_meters": radius,
-                "dominant_zone": dominant_category,
-                "ai_context_summary": f"Context: {percentages[dominant_category]}% {dominant_category} environment.",
-                "area_profile_percentages": percentages,
-                "diagnostics": {
-                    "is_rural_deduced": is_rural,
-                    "paved_roads_found": road_count,
-                    "mapped_structures_weight": round(original_weight, 1)
-                }
-            }
-
-        except Exception as e:
-            print(f"Surroundings Analyzer Error: {e}")
+def fetch_area_inputs(lat: float, lon: float, radius: int):
+    key = (round(lat, 4), round(lon, 4), radius)
+    inputs = _geometry_cache.get(key)
+    if inputs is None:
+        data = overpass.query(build_geometry_query(lat, lon, radius), timeout=GEOMETRY_QUERY_TIMEOUT)
+        if data is None:
+            return None
+        inputs = area_inputs(data.get("elements", []))
+        _geometry_cache.set(key, inputs, weight=table_bytes(inputs["rings"]) + TAGS_BYTES * len(inputs["tags"]))
+    return inputs
+
+def analyze_surrounding_area(lat: float, lon: float, radius: int = 300):
+    """Zone breakdown weighted by the area each polygon covers inside the radius circle."""
+    inputs = fetch_area_inputs(lat, lon, radius)
+    if inputs is None:
+        return {"error": "Failed to fetch surroundings data"}
+
+    try:
+        return score_area_inputs(inputs, lat, lon, radius)
+    except Exception as e:
+        print(f"Surroundings Analyzer Error: {e}")
+        return {"error": "Failed to fetch surroundings data"}
+
+def score_surroundings_by_area(elements, lat: float, lon: float, radius: int):
+    """
+    Zone breakdown from Overpass `out geom` elements: every landuse/natural polygon
+    and building footprint counts with its area clipped to the radius circle.
+    Building footprints are counted on top of the landuse they stand in.
+    Falls back to feature-count weighting when no mapped area reaches the circle.
+    """
+    return score_area_inputs(area_inputs(elements), lat, lon, radius)
+
+def area_inputs(elements):
+    """
+    What area scoring needs from `out geom` elements, without the point dicts:
+    a ring_table of the polygons, their categories, the paved road count, and
+    every element's tags for the count-weighted fallback.
+    """
+    road_count = 0
+    polygons = []
+    polygon_categories = []
+
+    for el in elements:
+        tags = el.get("tags", _NO_TAGS)
+
+        highway = tags.get("highway")
+        if highway is not None:
+            if highway not in UNPAVED_HIGHWAYS:
+                road_count += 1
+            continue
+
+        land_type = tags.get("landuse") or tags.get("natural")
+        building_type = tags.get("building")
+        if land_type:
+            category = classify_tag(land_type)
+        elif building_type:
+            category = classify_tag("residential" if building_type == "yes" else building_type)
+        else:
             continue
 
-    return {"error": "Failed to fetch surroundings data"}
+        outer, inner = element_rings(el)
+        if outer:
+            polygons.append((outer, inner))
+            polygon_categories.append(category)
+
+    return {
+        "rings": ring_table(polygons),
+        "categories": polygon_categories,
+        "road_count": road_count,
+        "tags": [el.get("tags", _NO_TAGS) for el in elements],
+    }
+
+def score_area_inputs(inputs, lat: float, lon: float, radius: int):
+    """Area-weighted zone breakdown from area_inputs around (lat, lon)."""
+    road_count = inputs["road_count"]
+    areas = table_areas(inputs["rings"], lat, lon, radius)
+    total_area = float(areas.sum())
+    if total_area <= 0:
+        return score_surroundings([{"tags": tags} for tags in inputs["tags"]], radius)
+
+    scores = {key: 0.0 for key in SURROUNDING_CATEGORIES}
+    scores[OTHER_CATEGORY] = 0.0
+    for category, area in zip(inputs["categories"], areas.tolist()):
+        scores[category] += area
+
+    percentages = {category: round(score / total_area * 100, 1) for category, score in scores.items()}
+    dominant_category = max(percentages, key=percentages.get)
+    circle_area = math.pi * radius * radius
+
+    return {
+        "radius_meters": radius,
+        "dominant_zone": dominant_category,
+        "ai_context_summary": f"Context: {percentages[dominant_category]}% {dominant_category} environment.",
+        "area_profile_percentages": percentages,
+        "diagnostics": {
+            "weighting": "area",
+            "is_rural_deduced": dominant_category in ("Agriculture", "Nature & Parks") and road_count < 15,
+            "paved_roads_found": road_count,
+            "mapped_structures_weight": round(total_area, 1),
+            "circle_area_m2": round(circle_area, 1)
+        }
+    }
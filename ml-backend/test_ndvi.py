@@ -0,0 +1,75 @@
+"""
+Test script for the offline NDVI stage
+Checks ndvi_stats against the test_bands.npy fixture; needs no Earth Engine.
+Run from the ml-backend folder:  python test_ndvi.py
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+FIXTURE = Path(__file__).resolve().parent / "test_bands.npy"
+
+# test_bands.npy: 128 x 128 uint16 red/NIR, with 512 pixels masked (zero in both bands)
+EXPECTED_PIXELS = 128 * 128
+EXPECTED_VALID = EXPECTED_PIXELS - 512
+EXPECTED_MEAN = 0.1806
+EXPECTED_VEGETATED = 0.2581
+
+def test_ndvi_stats():
+    """ndvi_stats on the fixture matches the known values and a direct float64 computation"""
+    print("Testing ndvi_stats on test_bands.npy...")
+    try:
+        from imaging.vegetation import VEGETATION_NDVI, ndvi_stats
+        stats = ndvi_stats(str(FIXTURE))
+
+        assert stats["pixel_count"] == EXPECTED_PIXELS, stats
+        assert stats["valid_pixels"] == EXPECTED_VALID, stats
+        assert stats["mean"] == EXPECTED_MEAN, stats
+        assert stats["vegetated_fraction"] == EXPECTED_VEGETATED, stats
+        assert stats["p10"] <= stats["median"] <= stats["p90"], stats
+
+        bands = np.load(FIXTURE).astype(np.float64)
+        red, nir = bands[:, :, 0], bands[:, :, 1]
+        valid = (red + nir) > 0
+        ndvi = (nir[valid] - red[valid]) / (nir[valid] + red[valid])
+        assert stats["valid_pixels"] == ndvi.size, (stats, ndvi.size)
+        assert abs(stats["mean"] - ndvi.mean()) < 1e-4, (stats, ndvi.mean())
+        assert abs(stats["vegetated_fraction"] - np.mean(ndvi > VEGETATION_NDVI)) < 1e-4, stats
+
+        print(f"✓ ndvi_stats correct: mean {stats['mean']}, {stats['valid_pixels']} valid pixels, "
+              f"{stats['vegetated_fraction']:.1%} vegetated")
+        return True
+    except Exception as e:
+        print(f"✗ ndvi_stats error: {e!r}")
+        return False
+
+def test_ndvi_stats_bytes():
+    """The .npy bytes the imagery cache stores give the same stats as the file"""
+    print("\nTesting ndvi_stats on .npy bytes...")
+    try:
+        from imaging.vegetation import ndvi_stats
+        assert ndvi_stats(FIXTURE.read_bytes()) == ndvi_stats(str(FIXTURE))
+        print("✓ Bytes and file input agree")
+        return True
+    except Exception as e:
+        print(f"✗ ndvi_stats bytes error: {e!r}")
+        return False
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("NDVI Test Suite")
+    print("=" * 50)
+
+    results = []
+    results.append(("NDVI stats", test_ndvi_stats()))
+    results.append(("NDVI from bytes", test_ndvi_stats_bytes()))
+
+    print("\n" + "=" * 50)
+    print("Test Results Summary")
+    print("=" * 50)
+    for test_name, result in results:
+        status = "✓ PASS" if result else "✗ FAIL"
+        print(f"{test_name}: {status}")
+
+    sys.exit(0 if all(result for _, result in results) else 1)
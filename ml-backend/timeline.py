@@ -0,0 +1,103 @@
+import json
+
+from change_detection.change_detector import CHANGE_THRESHOLD, detect_change
+from raster_analysis import get_raster_executor
+from satellite_data.imagery_cache import imagery_cache, imagery_key
+from satellite_data.pipeline import (
+    DEFAULT_BUFFER_M,
+    THUMBNAILS,
+    get_thumbnails_bytes,
+    window_ttl,
+    year_window,
+)
+
+# Sentinel-2 surface reflectance coverage starts in 2017
+FIRST_YEAR = 2017
+MAX_TIMELINE_YEARS = 15
+# Seconds to wait for room in the raster queue before giving up on a timeline
+RASTER_QUEUE_WAIT = 30
+
+
+def pair_key(lat, lon, old_year, new_year, buffer_m=DEFAULT_BUFFER_M):
+    """Cache key for the change between two yearly composites of one parcel."""
+    return imagery_key(
+        "change", lat, lon, buffer_m, year_window(old_year)[0], year_window(new_year)[1],
+        {"rgb": THUMBNAILS["rgb"][1], "threshold": CHANGE_THRESHOLD},
+    )
+
+
+def change_timeline(lat, lon, start_year, end_year, buffer_m=DEFAULT_BUFFER_M):
+    """
+    Change between every pair of consecutive years in [start_year, end_year].
+
+    Yearly composites are downloaded concurrently (and come from the imagery
+    cache when already on disk); each year pair is compared once in the raster
+    process pool and its result cached, so extending the range only costs the
+    new years. Years without usable imagery are skipped and the years on either
+    side of them compared instead; a year with no scene at all is remembered,
+    for good once its window has closed, so it is not requested again.
+    """
+    years = list(range(start_year, end_year + 1))
+    cached = {}
+
+    def cached_result(pair):
+        if pair not in cached:
+            body = imagery_cache.get_bytes(pair_key(lat, lon, *pair, buffer_m))
+            cached[pair] = None if body is None else json.loads(body)
+        return cached[pair]
+
+    images = {}
+    missing_years = []
+
+    def download(needed):
+        """Fetches the composites for `needed` side by side."""
+        wanted = [("rgb", year) for year in needed if year not in images and year not in missing_years]
+        if not wanted:
+            return
+        bodies, errors = get_thumbnails_bytes(lat, lon, wanted, buffer_m)
+        images.update((year, body) for (_, year), body in bodies.items())
+        for (_, year), e in sorted(errors.items()):
+            print(f"No imagery for {year}: {e}")
+            missing_years.append(year)
+
+    # 1. Only years in a pair that has not been computed before are downloaded
+    download(sorted({year for pair in zip(years, years[1:]) if cached_result(pair) is None for year in pair}))
+
+    # 2. Years without imagery are bridged by comparing their neighbours
+    available = [year for year in years if year not in missing_years]
+    pairs = list(zip(available, available[1:]))
+    download(sorted({year for pair in pairs if cached_result(pair) is None for year in pair}))
+
+    # 3. New pairs are compared in worker processes
+    executor = get_raster_executor()
+    jobs = {
+        pair: executor.submit_blocking(detect_change, images[pair[0]], images[pair[1]], timeout=RASTER_QUEUE_WAIT)
+        for pair in pairs if cached_result(pair) is None and pair[0] in images and pair[1] in images
+    }
+
+    series = []
+    for old_year, new_year in pairs:
+        result = cached_result((old_year, new_year))
+        if result is None:
+            if (old_year, new_year) not in jobs:
+                series.append({"from_year": old_year, "to_year": new_year, "error": "Imagery unavailable"})
+                continue
+            try:
+                result = jobs[(old_year, new_year)].result()
+            except Exception as e:
+                series.append({"from_year": old_year, "to_year": new_year, "error": str(e)})
+                continue
+            imagery_cache.set_bytes(
+                pair_key(lat, lon, old_year, new_year, buffer_m),
+                json.dumps(result).encode("utf-8"),
+                ttl=window_ttl(new_year),
+            )
+        series.append({"from_year": old_year, "to_year": new_year, **result})
+
+    return {
+        "start_year": start_year,
+        "end_year": end_year,
+        "series": series,
+        "missing_years": sorted(missing_years),
+        "computed_pairs": len(jobs),
+    }